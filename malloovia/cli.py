@@ -14,7 +14,8 @@ from .util import (
     get_schema,
     preprocess_yaml,
     read_problems_from_yaml,
-    solutions_to_yaml,
+    write_solutions_to_yaml,
+    _get_open_function_from_extension,
 )
 from .phases import PhaseI, PhaseII, OmniscientSTWPredictor
 
@@ -149,7 +150,8 @@ def validate_multiple_yaml_files(filenames, partial, problems_only, verbose):
     type=str,
     help=(
         "Name of the output (solutions) file. Defaults to the same name "
-        "than problems_file, with -sol suffix."
+        "than problems_file, with -sol suffix. It is compressed if it "
+        "ends with .yaml.gz"
     ),
 )
 @click.option(
@@ -258,9 +260,13 @@ def solve(
         output_file = str(root) + "-sol" + str(ext)
     click.echo("Writing solutions in {}...".format(output_file), nl=False)
     t_ini = time.process_time()
-    output = solutions_to_yaml(solutions)
-    with open(output_file, "w") as out_f:
-        out_f.write(output)
+    try:
+        _open = _get_open_function_from_extension(output_file)
+    except ValueError:
+        # Output files with other extensions are written as plain text
+        _open = open
+    with _open(output_file, "wt") as out_f:
+        write_solutions_to_yaml(solutions, out_f)
     click.echo("({:.3f}s)".format(time.process_time() - t_ini))
 
 
@@ -2,7 +2,7 @@
 #  import pandas as pd
 """Malloovia interface to LP solver"""
 
-from typing import Sequence, List, Any
+from typing import Sequence, List, Any, Optional
 from itertools import product as cartesian_product
 from inspect import ismethod
 from collections import namedtuple
@@ -104,6 +104,7 @@ class MallooviaLp:
         # Ensure that the workloads received are ordered by the field app in the same
         # ordering than the list system.apps
         self.workloads = reorder_workloads(workloads, system.apps)
+        self.preallocation = preallocation
         if preallocation is None:
             self.fixed_vms = None
         else:
@@ -121,6 +122,10 @@ class MallooviaLp:
         self.load_hist = get_load_hist_from_load(self.workloads)
         self.solver_called = False
 
+        # Cost and allocation of the last solution, computed on first request
+        self._cost: Optional[float] = None
+        self._allocation: Optional[AllocationInfo] = None
+
         # CookedData  stores some info required when building the problem, so that
         # this data is gathered only once, during __init__, and used when required
         CookedData = namedtuple(  # pylint: disable=invalid-name
@@ -248,6 +253,48 @@ class MallooviaLp:
 
         return self
 
+    def update_workloads(self, workloads: Sequence[Workload]) -> None:
+        """Replaces the workloads of a problem already created for a single timeslot.
+
+        The variables of the problem are kept, but they are bound to the new
+        workload tuple, and the goal function and the restrictions are rebuilt
+        for it. Since the variables keep the values of the last solution, the
+        problem can be solved again using that solution as starting point, for
+        solvers which support it (e.g.: ``COIN_CMD(mip_start=True)``).
+
+        Args:
+            workloads: list of workloads, one per app, with a single value each.
+
+        Raises:
+            ValueError: if the problem was not created yet, or if it was created
+                for (or the new workloads contain) more than one workload tuple.
+        """
+        workloads = reorder_workloads(workloads, self.system.apps)
+        load_hist = get_load_hist_from_load(workloads)
+        if self.pulp_problem is None or len(self.load_hist) != 1 or len(load_hist) != 1:
+            raise ValueError(
+                "Only problems already created for a single timeslot can be updated"
+            )
+        (old_load,) = self.load_hist.keys()
+        (new_load,) = load_hist.keys()
+        self.workloads = workloads
+        self.load_hist = load_hist
+
+        # The names of the variables are not changed, because they are only
+        # used to identify them in the files read by the solver
+        map_dem = {
+            (app, ins, new_load): variable
+            for (app, ins, load), variable in self.cooked.map_dem.items()
+            if load == old_load
+        }
+        self.cooked = self.cooked._replace(map_dem=map_dem)
+
+        self._cost = self._allocation = None
+        self.pulp_problem.objective = None
+        self.pulp_problem.constraints.clear()
+        self._cost_function()
+        self._add_all_restrictions()
+
     def _add_all_restrictions(self) -> None:
         """This functions uses introspection to discover all implemented
         methods whose name ends with ``_restriction``, and runs them all."""
@@ -357,20 +404,25 @@ class MallooviaLp:
             if cloud.max_vms == 0:
                 continue  # No restriction for this limiting set
 
+            # The instance classes in the limiting set, and the reserved part of
+            # the sum, do not depend on the workload
+            instances_dem = [
+                ic for ic in self.cooked.instances_dem if cloud in ic.limiting_sets
+            ]
+            reserved = [
+                self.cooked.map_res[app, ic]
+                for app in self.system.apps
+                for ic in self.cooked.instances_res
+                if cloud in ic.limiting_sets
+            ]
             for load in self.load_hist.keys():
                 self.pulp_problem += (
                     lpSum(
-                        [
-                            self.cooked.map_res[app, ic]
-                            for app in self.system.apps
-                            for ic in self.cooked.instances_res
-                            if cloud in ic.limiting_sets
-                        ]
+                        reserved
                         + [
                             self.cooked.map_dem[app, ic, load]
                             for app in self.system.apps
-                            for ic in self.cooked.instances_dem
-                            if cloud in ic.limiting_sets
+                            for ic in instances_dem
                         ]
                     )
                     <= cloud.max_vms,
@@ -390,20 +442,25 @@ class MallooviaLp:
             if cloud.max_cores == 0:
                 continue  # No restriction for this limiting set
 
+            # The instance classes in the limiting set, and the reserved part of
+            # the sum, do not depend on the workload
+            instances_dem = [
+                ic for ic in self.cooked.instances_dem if cloud in ic.limiting_sets
+            ]
+            reserved = [
+                self.cooked.map_res[app, ic] * ic.cores
+                for app in self.system.apps
+                for ic in self.cooked.instances_res
+                if cloud in ic.limiting_sets
+            ]
             for load in self.load_hist.keys():
                 self.pulp_problem += (
                     lpSum(
-                        [
-                            self.cooked.map_res[app, ic] * ic.cores
-                            for app in self.system.apps
-                            for ic in self.cooked.instances_res
-                            if cloud in ic.limiting_sets
-                        ]
+                        reserved
                         + [
                             self.cooked.map_dem[app, ic, load] * ic.cores
                             for app in self.system.apps
-                            for ic in self.cooked.instances_dem
-                            if cloud in ic.limiting_sets
+                            for ic in instances_dem
                         ]
                     )
                     <= cloud.max_cores,
@@ -422,6 +479,7 @@ class MallooviaLp:
             the value returned by ``LpProblem.solve()``.
         """
         self.solver_called = True
+        self._cost = self._allocation = None
         return self.pulp_problem.solve(*args, **kwargs)
 
     def get_status(self) -> Status:
@@ -442,7 +500,9 @@ class MallooviaLp:
         if self.pulp_problem.status != pulp.LpStatusOptimal:
             raise ValueError("Cannot get the cost when the status is not optimal")
 
-        return pulp.value(self.pulp_problem.objective)
+        if self._cost is None:
+            self._cost = pulp.value(self.pulp_problem.objective)
+        return self._cost
 
     def get_allocation(self) -> AllocationInfo:
         """Retrieves the allocation given by the solution of the LP problem.
@@ -457,6 +517,9 @@ class MallooviaLp:
         if self.pulp_problem.status != pulp.LpStatusOptimal:
             raise ValueError("Cannot get the cost when the status is not optimal")
 
+        if self._allocation is not None:
+            return self._allocation
+
         workload_tuples = []
         repeats = []
         allocation = []
@@ -475,7 +538,7 @@ class MallooviaLp:
                 )
                 workload_allocation.append(tuple(row))
             allocation.append(tuple(workload_allocation))
-        return AllocationInfo(
+        self._allocation = AllocationInfo(
             apps=tuple(self.system.apps),
             instance_classes=tuple(
                 self.cooked.instances_res + self.cooked.instances_dem
@@ -485,6 +548,7 @@ class MallooviaLp:
             values=tuple(allocation),
             units="vms",
         )
+        return self._allocation
 
     def get_reserved_allocation(self) -> ReservedAllocation:
         """Retrieves the allocation of reserved instances from the solution of the LP problem.
@@ -569,10 +633,9 @@ def get_load_hist_from_load(workloads: Sequence[Workload]) -> MallooviaHistogram
     assert all(
         len(w.values) == timeslots for w in workloads
     ), "All workloads should have the same length"
-    # Iterate over tuples of loads, one tuple per timeslot
-    workload_tuples = zip(*(w.values for w in workloads))
-    for load in workload_tuples:
-        hist[ShortReprTuple(load)] += 1
+    # Count the tuples of loads, one tuple per timeslot, directly in the
+    # histogram (in order of first appearance) with short representation
+    hist.update(map(ShortReprTuple, zip(*(w.values for w in workloads))))
     return hist
 
 
@@ -697,6 +760,12 @@ class MallooviaLpMaximizeTimeslotPerformance(MallooviaLp):
         """
         if self.pulp_problem.status == pulp.LpStatusNotSolved:  # Not solved
             raise ValueError("Cannot get the cost of an unsolved problem")
+        if self._cost is None:
+            self._cost = self._compute_cost()
+        return self._cost
+
+    def _compute_cost(self) -> float:
+        """Computes the cost of the allocation found by the solver"""
         return sum(
             self.cooked.instance_prices[ic] * self.cooked.map_res[app, ic].varValue
             for ic in self.cooked.instances_res
@@ -728,6 +797,31 @@ class MallooviaLpMaximizeTimeslotPerformance(MallooviaLp):
 # This patch only works when the solver is COIN.
 
 
+# Memory backed directory which can be used for the temporary files exchanged
+# with CBC, to avoid the disk round trip in each solve
+_SHM_DIR = "/dev/shm"
+
+
+def _temporary_directory(tmp_dir: str) -> str:
+    """Returns the directory for the temporary files exchanged with the solver.
+
+    If the environment variable ``MALLOOVIA_SHM_TMPDIR`` is ``1``, PuLP is using
+    the default ``/tmp`` directory, and a writable memory backed ``/dev/shm``
+    directory exists (e.g.: in Linux), this one is used instead. It is not the
+    default because ``/dev/shm`` can be too small for big problems (e.g.: 64 MB
+    in docker containers). Any other directory (e.g.: set through the ``TMPDIR``
+    environment variable) is respected.
+    """
+    if (
+        os.environ.get("MALLOOVIA_SHM_TMPDIR") == "1"
+        and tmp_dir == "/tmp"
+        and os.path.isdir(_SHM_DIR)
+        and os.access(_SHM_DIR, os.W_OK)
+    ):
+        return _SHM_DIR
+    return tmp_dir
+
+
 # pylint: disable=invalid-name,too-many-locals,missing-docstring,bare-except,too-many-branches,too-many-statements
 def _solve_CBC_patched(self, lp, use_mps=True): # pragma: no cover
     """Solve a MIP problem using CBC, patched from original PuLP function
@@ -748,10 +842,11 @@ def _solve_CBC_patched(self, lp, use_mps=True): # pragma: no cover
                               (self.path, os.getcwd()))
     if not self.keepFiles:
         uuid = uuid4().hex
-        tmpLp = os.path.join(self.tmpDir, "%s-pulp.lp" % uuid)
-        tmpMps = os.path.join(self.tmpDir, "%s-pulp.mps" % uuid)
-        tmpSol = os.path.join(self.tmpDir, "%s-pulp.sol" % uuid)
-        tmpSol_init = os.path.join(self.tmpDir, "%s-pulp_init.sol" % uuid)
+        tmpDir = _temporary_directory(self.tmpDir)
+        tmpLp = os.path.join(tmpDir, "%s-pulp.lp" % uuid)
+        tmpMps = os.path.join(tmpDir, "%s-pulp.mps" % uuid)
+        tmpSol = os.path.join(tmpDir, "%s-pulp.sol" % uuid)
+        tmpSol_init = os.path.join(tmpDir, "%s-pulp_init.sol" % uuid)
     else:
         tmpLp = lp.name+"-pulp.lp"
         tmpMps = lp.name+"-pulp.mps"
@@ -769,7 +864,9 @@ def _solve_CBC_patched(self, lp, use_mps=True): # pragma: no cover
         constraintsNames = dict((c, c) for c in lp.constraints)
         objectiveName = None
         cmds = ' '+tmpLp+" "
-    if self.mip_start:
+    # The initial solution is only passed if the variables have values, e.g.,
+    # from a previous solve of the same problem
+    if self.mip_start and any(v.varValue is not None for v in vs):
         self.writesol(tmpSol_init, lp, vs, variablesNames, constraintsNames)
         cmds += 'mips {} '.format(tmpSol_init)
     if self.threads:
@@ -822,7 +919,7 @@ def _solve_CBC_patched(self, lp, use_mps=True): # pragma: no cover
     lp.assignStatus(status, sol_status)
     lp.bestBound = takeBestBoundFromLog(tmpLp + ".log")
     if not self.keepFiles:
-        for f in [tmpMps, tmpLp, tmpSol, tmpSol_init]:
+        for f in [tmpMps, tmpLp, tmpSol, tmpSol_init, tmpLp + ".log"]:
             try:
                 os.remove(f)
             except:
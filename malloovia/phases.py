@@ -1,9 +1,13 @@
 """Module providing high level PhaseI and PhaseII classes which drive the solver"""
-from typing import Dict, Tuple, Any, Sequence, Optional
+from typing import Dict, Tuple, Any, Sequence, Optional, Iterable, Type, List
+from typing import TypeVar, cast
+import copy
 import time
-from collections import OrderedDict
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import collections.abc
-from pulp import PulpSolverError  # type: ignore
+from pulp import PulpSolverError, COIN_CMD, LpSolverDefault  # type: ignore
 
 from .lpsolver import MallooviaLp, MallooviaLpMaximizeTimeslotPerformance
 from .solution_model import (
@@ -17,7 +21,22 @@ from .solution_model import (
     Status,
     pulp_to_malloovia_status,
 )
-from .model import System, Problem, Workload, system_from_problem, check_valid_problem
+from .model import (
+    System,
+    Problem,
+    Workload,
+    App,
+    system_from_problem,
+    check_valid_problem,
+)
+
+_logger = logging.getLogger(__name__)
+
+# Compact version of a tuple of workloads, used as key for the cache of solutions
+WorkloadsKey = Tuple[Tuple[App, str, float], ...]
+
+# Any of the problem classes, so that the reused problems keep their own type
+_Lp = TypeVar("_Lp", bound=MallooviaLp)
 
 ###############################################################################
 # Phase I
@@ -41,6 +60,7 @@ class PhaseI:
             ValueError: if the problem stores inconsistent information.
         """
         self.problem = check_valid_problem(problem)
+        self._system = system_from_problem(self.problem)
         self.__solution: Optional[SolutionI] = None
         self.__full_solution = None
         self._malloovia_lp: Optional[MallooviaLp] = None
@@ -56,20 +76,29 @@ class PhaseI:
             solver: optional Pulp solver. It can have custom arguments, such
                 as fracGap and maxSeconds.
             relaxed: boolean; if True, the problem uses continuous variables
-                instead of integer ones.
+                instead of integer ones. In this case, if no solver is given, CBC
+                solves it as a linear problem, without branch and bound.
         Returns:
             The solution of the problem, which includes solving_stats, reserved_allocation
             and (full) allocation.
         """
 
+        if relaxed and solver is None:
+            solver = _default_solver(mip=False)
+
         # First creates the problem, then solves it
-        creation_time, self._malloovia_lp = _create_problem(
-            system=system_from_problem(self.problem),
+        (
+            creation_time,
+            solving_time,
+            malloovia_stats,
+            self._malloovia_lp,
+        ) = _create_and_solve(
+            system=self._system,
             workloads=self.problem.workloads,
+            preallocation=None,
             relaxed=relaxed,
-        )
-        solving_time, malloovia_stats = _solve_problem(
-            self._malloovia_lp, gcd=gcd, solver=solver
+            solver=solver,
+            gcd=gcd,
         )
 
         # Retrieve the solution and store it in a private property
@@ -143,19 +172,23 @@ class OmniscientSTWPredictor(
             raise ValueError("All workloads should have the same length")
 
     def __iter__(self):
-        return (  # Generator expression
-            tuple(
-                Workload(
-                    id=None,
-                    description=None,
-                    values=(w.values[i],),
-                    time_unit=w.time_unit,
-                    app=w.app,
-                )
-                for w in self.stwp
-            )
-            for i in range(self.timeslots)
-        )
+        # The Workload for each app and value is created only once, and shared
+        # by all the timeslots in which the app has that value
+        created: Tuple[Dict[float, Workload], ...] = tuple({} for _ in self.stwp)
+        for values in zip(*(w.values for w in self.stwp)):
+            timeslot = []
+            for w, value, workloads in zip(self.stwp, values, created):
+                workload = workloads.get(value)
+                if workload is None:
+                    workload = workloads[value] = Workload(
+                        id=None,
+                        description=None,
+                        values=(value,),
+                        time_unit=w.time_unit,
+                        app=w.app,
+                    )
+                timeslot.append(workload)
+            yield tuple(timeslot)
 
 
 class PhaseII:
@@ -185,7 +218,11 @@ class PhaseII:
                 instance classes.
             phase_i_solution: the solution returned by Phase I
             solver: optional Pulp solver. It can have custom arguments, such
-                as fracGap and maxSeconds.
+                as fracGap and maxSeconds. If it is created with ``mip_start=True``
+                (e.g.: ``COIN_CMD(mip_start=True)``), each timeslot uses the
+                solution of the previous one as starting point. In that case,
+                when several allocations have the same cost, the one chosen can
+                depend on the previous timeslot.
             reuse_rsv: boolean indicating if reserved instances that were assigned in
                 phase I to an application can be reused for another application.
         """
@@ -196,22 +233,34 @@ class PhaseII:
         self.solver = solver
         self.reuse_rsv = reuse_rsv
 
+        # The system does not depend on the workloads, so it is extracted
+        # from the problem only once
+        self._system = system_from_problem(problem)
+
         # Hash table with the already computed solutions for each workload level
-        # initially empty
-        self._solutions: Dict[
-            Tuple[System, Sequence[Workload]], SolutionI
-        ] = OrderedDict()
+        # initially empty. See self._solution_key() for the format of the keys
+        self._solutions: Dict[Tuple[Any, ...], SolutionI] = {}
 
-        # Internal handle to the inner malloovia LP solver
-        self._malloovia_lp = None
+        # Distinct tuples found in the allocations of the solutions, which are
+        # shared by all the allocations in which they appear
+        self._interned: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+
+        # Internal handle to the inner malloovia LP solver, which is reused
+        # for the next timeslot
+        self._malloovia_lp: Optional[MallooviaLp] = None
+        # and to the one used for the last infeasible timeslot
+        self._dual_lp: Optional[MallooviaLpMaximizeTimeslotPerformance] = None
 
     def solve_timeslot(
         self, workloads: Sequence[Workload], system: System = None, solver: Any = None
     ) -> SolutionI:
         """Solve one timeslot of phase II for the workload received.
 
-        The solution is stored in the field 'self._solutions' using the pairs (system, workloads)
-        as keys. If a solution for that key is already present, the same solution is returned.
+        The solution is stored in the field 'self._solutions' using the pairs
+        (system or ``None``, workloads key) as keys (see :func:`self._solution_key()`),
+        being the workloads key a compact version of the workloads (see
+        :func:`_workloads_key()`). If a solution for that key is already present,
+        the same solution is returned.
 
         Args:
             workloads: tuple with one Workload per app. Only the first value in the
@@ -226,11 +275,14 @@ class PhaseII:
             The solution for that timeslot, stored in a :class:`SolutionI` object.
         """
         if system is None:
-            system = system_from_problem(self.problem)
+            system = self._system
 
-        if (system, workloads) in self._solutions:
+        preallocation = self.phase_i_solution.reserved_allocation
+        key = self._solution_key(system, preallocation, workloads)
+        solution = self._solutions.get(key)
+        if solution is not None:
             # This workload was already solved. Nothing to be done
-            return self._solutions[system, workloads]
+            return solution
 
         if not self.reuse_rsv:
             raise NotImplementedError("Solving without reuse is not implemented")
@@ -238,120 +290,240 @@ class PhaseII:
         if solver is None:  # default to class solver
             solver = self.solver
 
-        # Instantiate problem
-        creation_time, malloovia_lp = _create_problem(
-            system=system,
-            workloads=workloads,
-            preallocation=self.phase_i_solution.reserved_allocation,
-            relaxed=False,
+        solving_stats, allocation = self._solve_reusing_lp(
+            system, workloads, preallocation, solver
         )
-        solving_time, malloovia_stats = _solve_problem(
-            malloovia_lp, gcd=False, solver=solver
+        return self._store_solution(
+            key, workloads, preallocation, solving_stats, allocation
         )
 
-        # Retrieve the solution and store it in a private property
-        allocation = None
-        optimal_cost = None
-        if malloovia_stats.status == Status.optimal:
-            allocation = malloovia_lp.get_allocation()
-            optimal_cost = malloovia_lp.get_cost()
-        else:
-            sol = _solve_dual_problem(
-                system=system,
-                workloads=workloads,
-                preallocation=self.phase_i_solution.reserved_allocation,
-                solver=solver,
-            )
-            creation_time += sol.solving_stats.creation_time
-            solving_time += sol.solving_stats.solving_time
-            if sol.solving_stats.algorithm.status == Status.optimal:
-                malloovia_stats = malloovia_stats._replace(status=Status.overfull)
-            else:
-                malloovia_stats = malloovia_stats._replace(
-                    status=sol.solving_stats.algorithm.status
-                )
-            optimal_cost = sol.solving_stats.optimal_cost
-            allocation = sol.allocation
-
-        solving_stats = SolvingStats(
-            algorithm=malloovia_stats,
-            creation_time=creation_time,
-            solving_time=solving_time,
-            optimal_cost=optimal_cost,
-        )
-
-        valid_id = "sol_for_{}".format("_".join(str(wl.values[0]) for wl in workloads))
-        self._solutions[system, workloads] = SolutionI(
-            id=valid_id,
-            problem=self.problem,
-            solving_stats=solving_stats,
-            reserved_allocation=self.phase_i_solution.reserved_allocation,
-            allocation=allocation,
-        )
-
-        return self._solutions[system, workloads]
-
-    def solve_period(self, predictor: STWPredictor = None) -> SolutionII:
+    def solve_period(
+        self, predictor: STWPredictor = None, max_workers: Optional[int] = 1
+    ) -> SolutionII:
         """Solves the complete reserved period by iteratively solving each timeslot.
 
         Args:
             predictor: a generator which yields one prediction tuple per timeslot.
                 If ``None``, a default :class:`OmniscientSTWPredictor` is instantiated
                 which iterates over the Problem.workloads values.
+            max_workers: number of worker processes used to solve the distinct
+                workload tuples of the period in parallel. The default (1) solves
+                them sequentially in the current process, and ``None`` uses as many
+                processes as processors in the machine. The system, the workloads
+                and the solver must be picklable to use more than one process.
 
         Returns:
             The global solution for phase II, which contains the allocation for each
             timeslot and SolvingStats for each timeslot.
         """
 
-        system = system_from_problem(self.problem)
+        system = self._system
         if predictor is None:
             predictor = OmniscientSTWPredictor(self.problem.workloads)
-        solutions = []
+
+        # Gather the whole batch of predictions first, numbering each distinct
+        # workload tuple, so that each one is solved only once, and then expand
+        # the solutions back to one per timeslot using those integer indexes
+        indexes: Dict[WorkloadsKey, int] = {}
+        unique_timeslots: List[Sequence[Workload]] = []
+        timeslot_indexes: List[int] = []
         for workloads in predictor:
-            solutions.append(self.solve_timeslot(system=system, workloads=workloads))
-        return self._aggregate_solutions(solutions)
+            key = _workloads_key(workloads)
+            index = indexes.get(key)
+            if index is None:
+                index = indexes[key] = len(unique_timeslots)
+                unique_timeslots.append(workloads)
+            timeslot_indexes.append(index)
+
+        if max_workers != 1:
+            self._solve_in_processes(system, unique_timeslots, max_workers)
+        unique_solutions = [
+            self.solve_timeslot(system=system, workloads=workloads)
+            for workloads in unique_timeslots
+        ]
+        return self._aggregate_solutions(
+            unique_solutions[index] for index in timeslot_indexes
+        )
+
+    def _solve_in_processes(
+        self,
+        system: System,
+        timeslots: Iterable[Sequence[Workload]],
+        max_workers: Optional[int],
+    ) -> None:
+        """Solves in a pool of processes the timeslots whose solution is not
+        already stored in ``self._solutions``, and stores those solutions,
+        so that later calls to :func:`self.solve_timeslot()` find them.
+
+        Args:
+            system: the part of the problem which does not depend on the workload.
+            timeslots: the tuples of workloads to solve, one per timeslot.
+            max_workers: maximum number of processes of the pool, or ``None``
+                to use as many as processors in the machine.
+        """
+        if not self.reuse_rsv:
+            raise NotImplementedError("Solving without reuse is not implemented")
+
+        preallocation = self.phase_i_solution.reserved_allocation
+        pending = {}
+        for workloads in timeslots:
+            key = self._solution_key(system, preallocation, workloads)
+            if key not in self._solutions:
+                pending[key] = workloads
+        if not pending:
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                _solve_timeslot_in_worker,
+                repeat(system),
+                pending.values(),
+                repeat(preallocation),
+                repeat(self.solver),
+            )
+            for (key, workloads), (solving_stats, allocation) in zip(
+                pending.items(), results
+            ):
+                # The allocation built by the worker process references copies
+                # of the apps and instance classes. Replace them by the original
+                # objects, which are the ones referenced from the problem
+                if allocation is not None:
+                    allocation = _rebind_allocation(allocation, system)
+                self._store_solution(
+                    key, workloads, preallocation, solving_stats, allocation
+                )
 
-    def _aggregate_solutions(self, solutions):
+    def _solve_reusing_lp(
+        self,
+        system: System,
+        workloads: Sequence[Workload],
+        preallocation: ReservedAllocation,
+        solver: Any,
+    ) -> Tuple[SolvingStats, AllocationInfo]:
+        """Solves one timeslot with :func:`_solve_timeslot()`, reusing the
+        MallooviaLp problems (the cost minimization one and its dual) of the last
+        timeslots solved if they were created for the same system and
+        preallocation, and keeping the problems solved for the next timeslot.
+
+        Returns:
+            The statistics of the solution and the allocation for the timeslot.
+        """
+        malloovia_lp = _reusable_lp(self._malloovia_lp, system, preallocation)
+        dual_lp = _reusable_lp(self._dual_lp, system, preallocation)
+        solving_stats, allocation, malloovia_lp, dual_lp = _solve_timeslot(
+            system, workloads, preallocation, solver, malloovia_lp, dual_lp
+        )
+        self._malloovia_lp = malloovia_lp
+        if dual_lp is not None:
+            self._dual_lp = dual_lp
+        return solving_stats, allocation
+
+    def _solution_key(
+        self,
+        system: System,
+        preallocation: ReservedAllocation,
+        workloads: Sequence[Workload],
+    ) -> Tuple[Any, ...]:
+        """Returns the key used to store in ``self._solutions`` the solution for
+        the given system, preallocation and workloads.
+
+        The system is replaced by ``None`` when it is the one extracted from
+        ``self.problem``, which is the usual case, to avoid hashing it.
+        """
+        key_system = None if system is self._system else system
+        return (key_system, _workloads_key(workloads))
+
+    def _store_solution(
+        self,
+        key: Tuple[Any, ...],
+        workloads: Sequence[Workload],
+        preallocation: ReservedAllocation,
+        solving_stats: SolvingStats,
+        allocation: AllocationInfo,
+    ) -> SolutionI:
+        """Builds the :class:`SolutionI` for one timeslot and stores it in
+        ``self._solutions`` under the given key.
+
+        Returns:
+            The solution stored.
+        """
+        if allocation is not None:
+            allocation = self._intern_allocation(allocation)
+        valid_id = "sol_for_{}".format("_".join(str(wl.values[0]) for wl in workloads))
+        solution = self._solutions[key] = SolutionI(
+            id=valid_id,
+            problem=self.problem,
+            solving_stats=solving_stats,
+            reserved_allocation=preallocation,
+            allocation=allocation,
+        )
+        return solution
+
+    def _intern_allocation(self, allocation: AllocationInfo) -> AllocationInfo:
+        """Replaces the tuples of an allocation (the allocation of each timeslot
+        and its rows, one per app) by equal tuples already found in previous
+        allocations, if any, so that all the timeslots of the period share
+        a single copy of each distinct allocation and row."""
+        values = []
+        for timeslot_values in allocation.values:
+            timeslot_values = tuple(
+                self._interned.setdefault(row, row) for row in timeslot_values
+            )
+            values.append(self._interned.setdefault(timeslot_values, timeslot_values))
+        return allocation._replace(values=tuple(values))
+
+    def _aggregate_solutions(self, solutions: Iterable[SolutionI]) -> SolutionII:
         """Build a SolutionII object from the data in the _solutions
         attribute. It has to convert the dictionary of Solutions for
         each load level into a single solution which will contain
         a list of stats (per time slot) plus a AllocationInfo with allocations
         per time slot.
+
+        The solutions (one per timeslot) are traversed only once, so they can
+        be given by a generator.
         """
-        if all(s.solving_stats.algorithm.status == Status.optimal for s in solutions):
-            global_status = Status.optimal
-        elif any(
-            s.solving_stats.algorithm.status == Status.infeasible for s in solutions
-        ):
-            global_status = Status.infeasible
-        elif any(
-            s.solving_stats.algorithm.status == Status.overfull for s in solutions
-        ):
-            global_status = Status.overfull
-        else:
-            global_status = Status.unknown
+        # Compute the totals and the set of statuses, and extract the stats,
+        # the workload tuple and the allocation of each timeslot as columns,
+        # in a single traversal of the solutions
+        creation_time = solving_time = optimal_cost = 0.0
+        statuses = set()
+        solving_stats = []
+        workload_tuples = []
+        values = []
+        first_allocation = None
+        for solution in solutions:
+            if first_allocation is None:
+                first_allocation = solution.allocation
+            stats = solution.solving_stats
+            creation_time += stats.creation_time
+            solving_time += stats.solving_time
+            optimal_cost += stats.optimal_cost
+            statuses.add(stats.algorithm.status)
+            solving_stats.append(stats)
+            workload_tuples.append(solution.allocation.workload_tuples[0])
+            values.append(solution.allocation.values[0])
+        assert first_allocation is not None, "There are no solutions to aggregate"
 
         global_solving_stats = GlobalSolvingStats(
-            creation_time=sum(s.solving_stats.creation_time for s in solutions),
-            solving_time=sum(s.solving_stats.solving_time for s in solutions),
-            optimal_cost=sum(s.solving_stats.optimal_cost for s in solutions),
-            status=global_status,
+            creation_time=creation_time,
+            solving_time=solving_time,
+            optimal_cost=optimal_cost,
+            status=_global_status(statuses),
         )
 
         allocation = AllocationInfo(
-            apps=solutions[0].allocation.apps,
-            instance_classes=solutions[0].allocation.instance_classes,
-            workload_tuples=[s.allocation.workload_tuples[0] for s in solutions],
-            repeats=[1] * len(solutions),
-            values=tuple(s.allocation.values[0] for s in solutions),
+            apps=first_allocation.apps,
+            instance_classes=first_allocation.instance_classes,
+            workload_tuples=workload_tuples,
+            repeats=[1] * len(values),
+            values=tuple(values),
             units="vms",
         )
 
         return SolutionII(
             id="solution_phase_ii_{}".format(self.problem.id),
             problem=self.problem,
-            solving_stats=[s.solving_stats for s in solutions],
+            solving_stats=solving_stats,
             previous_phase=self.phase_i_solution,
             global_solving_stats=global_solving_stats,
             allocation=allocation,
@@ -364,12 +536,6 @@ class PhaseIIGuided(PhaseII):
     minimum number of on-demand instances and a fixed number of reserved instances.
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._solutions: Dict[
-            Tuple[System, ReservedAllocation, Sequence[Workload]], SolutionI
-        ] = OrderedDict()
-
     def solve_timeslot(
         self,
         workloads: Sequence[Workload],
@@ -380,8 +546,8 @@ class PhaseIIGuided(PhaseII):
         """Solve one timeslot of phase II for the workload received.
 
         The solution is stored in the field 'self._solutions' using the tuples
-        (system, preallocation, workloads) as keys. If a solution for that key
-        is already present, the same solution is returned.
+        (system or ``None``, preallocation, workloads key) as keys. If a solution
+        for that key is already present, the same solution is returned.
 
         Args:
             workloads: tuple with one Workload per app. Only the first value in the
@@ -400,7 +566,7 @@ class PhaseIIGuided(PhaseII):
             The solution for that timeslot, stored in a :class:`SolutionI` object.
         """
         if system is None:
-            system = system_from_problem(self.problem)
+            system = self._system
 
         if preallocation is None:
             preallocation = self.phase_i_solution.reserved_allocation
@@ -413,9 +579,11 @@ class PhaseIIGuided(PhaseII):
                 vms_number=res_vms_number + preallocation.vms_number,
             )
 
-        if (system, preallocation, workloads) in self._solutions:
+        key = self._solution_key(system, preallocation, workloads)
+        solution = self._solutions.get(key)
+        if solution is not None:
             # This workload was already solved. Nothing to be done
-            return self._solutions[system, preallocation, workloads]
+            return solution
 
         if not self.reuse_rsv:
             raise NotImplementedError("Solving without reuse is not implemented")
@@ -423,58 +591,140 @@ class PhaseIIGuided(PhaseII):
         if solver is None:  # default to class solver
             solver = self.solver
 
-        # Instantiate problem
-        creation_time, malloovia_lp = _create_problem(
+        solving_stats, allocation = self._solve_reusing_lp(
+            system, workloads, preallocation, solver
+        )
+        return self._store_solution(
+            key, workloads, preallocation, solving_stats, allocation
+        )
+
+    def _solution_key(
+        self,
+        system: System,
+        preallocation: ReservedAllocation,
+        workloads: Sequence[Workload],
+    ) -> Tuple[Any, ...]:
+        """Returns the key used to store in ``self._solutions`` the solution for
+        the given system, preallocation and workloads."""
+        key_system = None if system is self._system else system
+        return (key_system, preallocation, _workloads_key(workloads))
+
+
+def _solve_timeslot(
+    system: System,
+    workloads: Sequence[Workload],
+    preallocation: ReservedAllocation,
+    solver: Any,
+    malloovia_lp: Optional[MallooviaLp] = None,
+    dual_lp: Optional[MallooviaLpMaximizeTimeslotPerformance] = None,
+) -> Tuple[
+    SolvingStats,
+    AllocationInfo,
+    MallooviaLp,
+    Optional[MallooviaLpMaximizeTimeslotPerformance],
+]:
+    """Solves one timeslot of phase II. If the timeslot is infeasible, the
+    dual problem which maximizes the performance is solved instead.
+
+    Args:
+        system: infrastructure, apps and performance of the system
+        workloads: tuple with one Workload per app, for the timeslot to solve
+        preallocation: allocation for reserved instances, from phase I, plus
+            the minimum number of on-demand instances, if any
+        solver: the PuLP solver to use
+        malloovia_lp: problem already created for a previous timeslot with the
+            same system and preallocation, which is updated with the new
+            workloads instead of creating a new one. Its variables keep the
+            previous solution, which can be used by the solver as a warm start.
+        dual_lp: dual problem already created for a previous infeasible timeslot
+            with the same system and preallocation, which is reused in the same way.
+
+    Returns:
+        The statistics of the solution, the allocation for the timeslot, the
+        MallooviaLp problem solved, and the dual problem solved (or ``None`` if the
+        timeslot was feasible). Both problems can be reused for the next timeslots.
+    """
+    creation_time, solving_time, malloovia_stats, malloovia_lp = _create_and_solve(
+        system=system,
+        workloads=workloads,
+        preallocation=preallocation,
+        relaxed=False,
+        solver=solver,
+        gcd=False,
+        malloovia_lp=malloovia_lp,
+    )
+
+    # Retrieve the solution
+    allocation = None
+    optimal_cost = None
+    if malloovia_stats.status == Status.optimal:
+        allocation = malloovia_lp.get_allocation()
+        optimal_cost = malloovia_lp.get_cost()
+        dual_lp = None
+    else:
+        sol, dual_lp = _solve_dual_problem(
             system=system,
             workloads=workloads,
             preallocation=preallocation,
-            relaxed=False,
-        )
-        solving_time, malloovia_stats = _solve_problem(
-            malloovia_lp, gcd=False, solver=solver
+            solver=solver,
+            malloovia_lp=dual_lp,
         )
-
-        # Retrieve the solution and store it in a private property
-        allocation = None
-        optimal_cost = None
-        if malloovia_stats.status == Status.optimal:
-            allocation = malloovia_lp.get_allocation()
-            optimal_cost = malloovia_lp.get_cost()
+        creation_time += sol.solving_stats.creation_time
+        solving_time += sol.solving_stats.solving_time
+        if sol.solving_stats.algorithm.status == Status.optimal:
+            malloovia_stats = malloovia_stats._replace(status=Status.overfull)
         else:
-            sol = _solve_dual_problem(
-                system=system,
-                workloads=workloads,
-                preallocation=preallocation,
-                solver=solver,
+            malloovia_stats = malloovia_stats._replace(
+                status=sol.solving_stats.algorithm.status
             )
-            creation_time += sol.solving_stats.creation_time
-            solving_time += sol.solving_stats.solving_time
-            if sol.solving_stats.algorithm.status == Status.optimal:
-                malloovia_stats = malloovia_stats._replace(status=Status.overfull)
-            else:
-                malloovia_stats = malloovia_stats._replace(
-                    status=sol.solving_stats.algorithm.status
-                )
-            optimal_cost = sol.solving_stats.optimal_cost
-            allocation = sol.allocation
+        optimal_cost = sol.solving_stats.optimal_cost
+        allocation = sol.allocation
 
-        solving_stats = SolvingStats(
-            algorithm=malloovia_stats,
-            creation_time=creation_time,
-            solving_time=solving_time,
-            optimal_cost=optimal_cost,
-        )
+    solving_stats = SolvingStats(
+        algorithm=malloovia_stats,
+        creation_time=creation_time,
+        solving_time=solving_time,
+        optimal_cost=optimal_cost,
+    )
+    return solving_stats, allocation, malloovia_lp, dual_lp
 
-        valid_id = "sol_for_{}".format("_".join(str(wl.values[0]) for wl in workloads))
-        self._solutions[system, preallocation, workloads] = SolutionI(
-            id=valid_id,
-            problem=self.problem,
-            solving_stats=solving_stats,
-            reserved_allocation=preallocation,
-            allocation=allocation,
-        )
 
-        return self._solutions[system, preallocation, workloads]
+def _solve_timeslot_in_worker(
+    system: System,
+    workloads: Sequence[Workload],
+    preallocation: ReservedAllocation,
+    solver: Any,
+) -> Tuple[SolvingStats, AllocationInfo]:
+    """Calls :func:`_solve_timeslot()` in a worker process of
+    :func:`PhaseII.solve_period()`, and returns only the statistics and the
+    allocation, which are sent back to the main process.
+    """
+    solving_stats, allocation, _, _ = _solve_timeslot(
+        system, workloads, preallocation, solver
+    )
+    return solving_stats, allocation
+
+
+def _rebind_allocation(allocation: AllocationInfo, system: System) -> AllocationInfo:
+    """Replaces the apps and instance classes referenced from an allocation
+    by the equal objects found in the system.
+
+    Args:
+        allocation: allocation whose apps and instance classes are (equal)
+            copies of the ones in ``system``, e.g. because it was unpickled
+        system: the system which holds the original objects
+
+    Returns:
+        A new allocation referencing the objects in ``system``.
+    """
+    apps = {app: app for app in system.apps}
+    instance_classes = {ic: ic for ic in system.instance_classes}
+    return allocation._replace(
+        apps=tuple(apps[app] for app in allocation.apps),
+        instance_classes=tuple(
+            instance_classes[ic] for ic in allocation.instance_classes
+        ),
+    )
 
 
 def _solve_dual_problem(
@@ -482,35 +732,36 @@ def _solve_dual_problem(
     workloads: Sequence[Workload],
     preallocation: Optional[ReservedAllocation],
     solver: Any = None,
-) -> SolutionI:
+    malloovia_lp: Optional[MallooviaLpMaximizeTimeslotPerformance] = None,
+) -> Tuple[SolutionI, MallooviaLpMaximizeTimeslotPerformance]:
     """Uses MallooviaLpMaximizeTimeslotPerformance to solve the dual problem
 
     Args:
         system: infrastructure, apps and performance of the system
         workloads: list of workloads, one per app
         preallocation: allocation for reserved instances, from phase I, or None
+        malloovia_lp: dual problem already created for the same system and
+            preallocation, which is updated with the workloads instead of
+            creating a new one, or None
 
     Returns:
         A :class:`SolutionI` object with the solution which maximizes performance
-        in the timeslot.
+        in the timeslot, and the dual problem solved.
     """
 
-    malloovia_lp = MallooviaLpMaximizeTimeslotPerformance(
+    creation_time, solving_time, malloovia_stats, dual_lp = _create_and_solve(
         system=system,
         workloads=workloads,
         preallocation=preallocation,
         relaxed=False,  # TODO: Allow for relaxed in PhaseII?
-    )
-    start = time.perf_counter()
-    malloovia_lp.create_problem()
-    creation_time = time.perf_counter() - start
-
-    solving_time, malloovia_stats = _solve_problem(
-        malloovia_lp=malloovia_lp, gcd=False, solver=solver
+        solver=solver,
+        gcd=False,
+        malloovia_lp=malloovia_lp,
+        lp_class=MallooviaLpMaximizeTimeslotPerformance,
     )
 
-    allocation = malloovia_lp.get_allocation()
-    optimal_cost = malloovia_lp.get_cost()
+    allocation = dual_lp.get_allocation()
+    optimal_cost = dual_lp.get_cost()
 
     solving_stats = SolvingStats(
         algorithm=malloovia_stats,
@@ -519,45 +770,189 @@ def _solve_dual_problem(
         optimal_cost=optimal_cost,
     )
 
-    return SolutionI(
+    solution = SolutionI(
         id=None,
         problem=None,
         solving_stats=solving_stats,
         reserved_allocation=None,
         allocation=allocation,
     )
+    return solution, cast(MallooviaLpMaximizeTimeslotPerformance, dual_lp)
+
+
+def _default_solver(**options: Any) -> Any:
+    """Returns the solver used when none is given.
+
+    It is a copy of PuLP's default solver with the given options (attributes
+    of COIN_CMD) changed, if it is CBC. If PuLP's default solver is not CBC,
+    ``None`` is returned, so that PuLP uses its default solver as is.
+
+    Args:
+        options: attributes to change in the solver, e.g. ``mip=False``
+            to solve relaxed problems without branch and bound.
+    """
+    if not isinstance(LpSolverDefault, COIN_CMD):
+        return None
+    solver = copy.copy(LpSolverDefault)
+    for name, value in options.items():
+        setattr(solver, name, value)
+    return solver
+
+
+def _global_status(statuses: Iterable[Status]) -> Status:
+    """Combines the statuses of the timeslots of a period into a global status.
+
+    The global status is optimal if all timeslots are optimal. Otherwise it is
+    infeasible if any timeslot is infeasible, overfull if any timeslot is
+    overfull, and unknown in any other case.
+
+    Args:
+        statuses: the status of each timeslot.
+
+    Returns:
+        The global status for the period.
+    """
+    distinct = set(statuses)
+    if distinct <= {Status.optimal}:
+        return Status.optimal
+    if Status.infeasible in distinct:
+        return Status.infeasible
+    if Status.overfull in distinct:
+        return Status.overfull
+    return Status.unknown
+
+
+def _reusable_lp(
+    malloovia_lp: Optional[_Lp],
+    system: System,
+    preallocation: ReservedAllocation,
+) -> Optional[_Lp]:
+    """Returns the problem received if it was created for the given system and
+    preallocation, so that it can be updated for another timeslot, or ``None``
+    otherwise."""
+    if (
+        malloovia_lp is None
+        or malloovia_lp.system is not system
+        or malloovia_lp.preallocation != preallocation
+    ):
+        return None
+    return malloovia_lp
+
+
+def _workloads_key(workloads: Sequence[Workload]) -> WorkloadsKey:
+    """Builds a compact hashable key from a tuple of short-term workloads.
+
+    The key only keeps the fields of each :class:`Workload` which affect the
+    LP problem (the app, the time unit and the workload for the timeslot), so
+    that workloads which only differ in their id, description or filename share
+    the same solution, and looking up the key does not hash those fields.
+
+    Args:
+        workloads: tuple with one Workload per app.
+
+    Returns:
+        A tuple with one ``(app, time_unit, value)`` triple per workload.
+    """
+    return tuple((wl.app, wl.time_unit, wl.values[0]) for wl in workloads)
+
+
+class _Timer:
+    """Context manager which measures the wall-clock time spent inside
+    its ``with`` block, and stores it (in seconds) in the attribute ``elapsed``."""
+
+    def __init__(self) -> None:
+        self.elapsed = 0.0
+        self._start = 0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # Integer nanoseconds, converted to seconds only once
+        self.elapsed = (time.perf_counter_ns() - self._start) * 1e-9
 
 
 # Functions which interface with lpSolver.MallooviaLp to create and solve the problem
+def _create_and_solve(
+    system: System,
+    workloads: Sequence[Workload],
+    preallocation: Optional[ReservedAllocation],
+    relaxed: bool,
+    solver: Any,
+    gcd: bool,
+    malloovia_lp: Optional[MallooviaLp] = None,
+    lp_class: Optional[Type[MallooviaLp]] = None,
+) -> Tuple[float, float, MallooviaStats, MallooviaLp]:
+    """Creates a problem (or updates the one received with new workloads)
+    and solves it.
+
+    Args:
+        system: infrastructure, apps and performance of the system
+        workloads: list of workloads, one per app
+        preallocation: allocation for reserved instances, from phase I, or None
+        relaxed: whether the problem has to be created relaxed or integer.
+        solver: the PuLP solver to be used by MallooviaLp.
+        gcd: whether the problem has to be solved with GCD method or not.
+        malloovia_lp: problem already created for the same system, preallocation
+            and relaxation, which is updated with the workloads instead of creating
+            a new one, or None
+        lp_class: the class of the problem to create, if it is not MallooviaLp
+
+    Returns:
+        The time required to create (or update) the problem, the time required
+        to solve it, the statistics from the solver, and the problem solved.
+    """
+    if malloovia_lp is None:
+        creation_time, malloovia_lp = _create_problem(
+            system=system,
+            workloads=workloads,
+            preallocation=preallocation,
+            relaxed=relaxed,
+            lp_class=lp_class,
+        )
+    else:
+        with _Timer() as timer:
+            malloovia_lp.update_workloads(workloads)
+        creation_time = timer.elapsed
+    solving_time, malloovia_stats = _solve_problem(
+        malloovia_lp, gcd=gcd, solver=solver
+    )
+    return creation_time, solving_time, malloovia_stats, malloovia_lp
+
+
 def _create_problem(
     system: System,
     workloads: Sequence[Workload],
     preallocation: ReservedAllocation = None,
     relaxed: bool = False,
+    lp_class: Optional[Type[MallooviaLp]] = None,
 ) -> Tuple[float, MallooviaLp]:
-    """Instantiates MallooviaLp class with the problem definition, and calls
-    :func:`MallooviaLp.create_problem()`.
+    """Instantiates MallooviaLp class (or the subclass received) with the problem
+    definition, and calls :func:`MallooviaLp.create_problem()`.
 
     Args:
         system: infrastructure, apps and performance of the system
         workloads: list of workloads, one per app
         preallocation: allocation for reserved instances, from phase I, or None
         relaxed: whether the problem has to be created relaxed or integer.
+        lp_class: the class of the problem to create, if it is not MallooviaLp
 
     Returns:
         The time required to create the problem, and the instance of MallooviaLp
         with the problem already created.
     """
     # Instantiate LP problem
-    _malloovia_lp = MallooviaLp(
+    if lp_class is None:
+        lp_class = MallooviaLp
+    _malloovia_lp = lp_class(
         system=system, workloads=workloads, preallocation=preallocation, relaxed=relaxed
     )
 
     # Write the LP problem and measure the time required to create it
-    start = time.perf_counter()
-    _malloovia_lp.create_problem()
-    creation_time = time.perf_counter() - start
-    return creation_time, _malloovia_lp
+    with _Timer() as timer:
+        _malloovia_lp.create_problem()
+    return timer.elapsed, _malloovia_lp
 
 
 def _solve_problem(
@@ -586,24 +981,23 @@ def _solve_problem(
         max_seconds = solver.maxSeconds
 
     # Solve the problem and measure the time required
-    start = time.perf_counter()
-    try:
-        malloovia_lp.solve(solver, use_mps=False)
-    except PulpSolverError as exception:
-        end = time.perf_counter()
-        solving_time = end - start
+    error = None
+    with _Timer() as timer:
+        try:
+            malloovia_lp.solve(solver, use_mps=False)
+        except PulpSolverError as exception:
+            error = exception
+    solving_time = timer.elapsed
+
+    if error is None:
+        status = pulp_to_malloovia_status(malloovia_lp.pulp_problem.status)
+    else:
         status = Status.cbc_error
-        print(
-            "Exception PulpSolverError. Time to failure: {} seconds\n".format(
-                solving_time
-            ),
-            exception,
+        _logger.warning(
+            "Exception PulpSolverError. Time to failure: %s seconds\n%s",
+            solving_time,
+            error,
         )
-    else:
-        # No exceptions
-        end = time.perf_counter()
-        solving_time = end - start
-        status = pulp_to_malloovia_status(malloovia_lp.pulp_problem.status)
 
     if status == Status.aborted:
         lower_bound = malloovia_lp.pulp_problem.bestBound
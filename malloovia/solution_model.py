@@ -2,9 +2,9 @@
 
 """Classes for storing and reporting solutions of malloovia problems."""
 
-from typing import Union, NamedTuple, Optional, List, Sequence, Tuple
+from typing import Union, NamedTuple, Optional, List, Sequence, Tuple, Dict
 from enum import IntEnum
-from functools import singledispatch
+from collections import Counter
 import pulp  # type: ignore
 
 from .model import (
@@ -29,39 +29,85 @@ class Status(IntEnum):
     unknown = 8
 
 
+# Malloovia Status for each PuLP status code. Any other code is Status.unknown
+_PULP_STATUS_MAP = {
+    pulp.LpStatusInfeasible: Status.infeasible,
+    pulp.LpStatusNotSolved: Status.aborted,
+    pulp.LpStatusOptimal: Status.optimal,
+    pulp.LpStatusUndefined: Status.integer_infeasible,
+}
+
+
 def pulp_to_malloovia_status(status: int) -> Status:
     """Receives a PuLP status code and returns a Malloovia :class:`Status`."""
-    if status == pulp.LpStatusInfeasible:
-        r = Status.infeasible
-    elif status == pulp.LpStatusNotSolved:
-        r = Status.aborted
-    elif status == pulp.LpStatusOptimal:
-        r = Status.optimal
-    elif status == pulp.LpStatusUndefined:
-        r = Status.integer_infeasible
-    else:
-        r = Status.unknown
-    return r
-
-
-class MallooviaHistogram(dict):
+    return _PULP_STATUS_MAP.get(status, Status.unknown)
+
+
+class MallooviaHistogram(Counter):
     """This class stores a multi-dimensional histogram, providing the same
     interface than a standard dict whose keys are workload tuples and the
     values are the count of the number of times that the tuple is observed
-    in the computed period."""
+    in the computed period. As a :class:`collections.Counter`, the value
+    for missing keys is zero.
+
+    The copies and the results of the arithmetic operators (``+``, ``-``, ``|``,
+    ``&`` and the unary ones) are also histograms with the same apps. As in
+    :class:`collections.Counter`, those operators drop the workload tuples whose
+    count is not positive. Combining histograms of different apps raises a
+    ``ValueError``."""
 
     apps: Tuple[App, ...] = None
     """The apps attribute stores a tuple with references to the apps involved
     in the workload. The order of this tuple must match the order of workloads for
     of each tuple which acts as key in the histogram"""
 
-    def __missing__(self, key):
-        # Default value for missing keys is zero
-        return 0
+    def __reduce__(self):
+        # Counter does not keep the instance attributes (apps) when pickled
+        return self.__class__, (dict(self),), self.__dict__
 
     def __repr__(self):
         return "MallooviaHistogram with %d values" % len(self)
 
+    def copy(self) -> "MallooviaHistogram":
+        "Returns a shallow copy of the histogram, with the same apps."
+        return self._with_apps(self)
+
+    def __add__(self, other):
+        return self._combine(Counter.__add__, other)
+
+    def __sub__(self, other):
+        return self._combine(Counter.__sub__, other)
+
+    def __or__(self, other):
+        return self._combine(Counter.__or__, other)
+
+    def __and__(self, other):
+        return self._combine(Counter.__and__, other)
+
+    def __pos__(self):
+        return self._with_apps(Counter.__pos__(self))
+
+    def __neg__(self):
+        return self._with_apps(Counter.__neg__(self))
+
+    def _combine(self, operator, other):
+        # Counter builds its results as plain Counters, which lose the apps
+        if (
+            isinstance(other, MallooviaHistogram)
+            and None not in (self.apps, other.apps)
+            and self.apps != other.apps
+        ):
+            raise ValueError("Cannot combine histograms of different apps")
+        result = operator(self, other)
+        if result is NotImplemented:
+            return result
+        return self._with_apps(result)
+
+    def _with_apps(self, counts) -> "MallooviaHistogram":
+        result = self.__class__(counts)
+        result.apps = self.apps
+        return result
+
 
 @remove_namedtuple_defaultdoc
 class MallooviaStats(NamedTuple):
@@ -258,75 +304,173 @@ class SolutionII(NamedTuple):
         allocations of the individual timeslots."""
 
 
-@singledispatch
-def compute_allocation_cost(alloc: AllocationInfo) -> AllocationInfo:
+def _multiply_allocation_values(
+    values: Tuple[Tuple[Tuple[float, ...], ...], ...],
+    *factors: Tuple[Tuple[float, ...], ...]
+) -> Tuple[Tuple[Tuple[Tuple[float, ...], ...], ...], ...]:
+    """Multiplies element-wise the allocation of each timeslot by one or more
+    matrices, in a single pass over the timeslots.
+
+    Args:
+        values: the ``values`` field of an allocation (timeslot x app x instance
+            class)
+        factors: matrices with the factor for each app (row) and instance
+            class (column)
+
+    Returns:
+        A tuple with the products for each matrix in ``factors``, each one with
+        the same shape than ``values``. Timeslots which share the same row
+        object in ``values`` (as Phase II does for repeated workloads) are
+        multiplied once, and share the resulting rows too.
+    """
+    # Keyed by id(), which is safe because ``values`` keeps the rows alive
+    products: Dict[int, Tuple[Tuple[Tuple[float, ...], ...], ...]] = {}
+    results: Tuple[list, ...] = tuple([] for _ in factors)
+    for row in values:
+        row_products = products.get(id(row))
+        if row_products is None:
+            # All the products of a row are computed while it is at hand
+            row_products = tuple(
+                tuple(
+                    [
+                        tuple([vms * factor for vms, factor in zip(app_alloc, f)])
+                        for app_alloc, f in zip(row, matrix)
+                    ]
+                )
+                for matrix in factors
+            )
+            products[id(row)] = row_products
+        for result, product in zip(results, row_products):
+            result.append(product)
+    return tuple(tuple(result) for result in results)
+
+
+def _price_matrix(alloc: AllocationInfo) -> Tuple[Tuple[float, ...], ...]:
+    """Returns the price of each instance class (column), repeated for each app
+    (row) of the allocation."""
+    # The vector of prices is the same for every app and timeslot
+    prices = tuple(iclass.price for iclass in alloc.instance_classes)
+    return (prices,) * len(alloc.apps)
+
+
+def _performance_matrix(
+    alloc: AllocationInfo, performances: PerformanceValues
+) -> Tuple[Tuple[float, ...], ...]:
+    """Returns the performance of each instance class (column) for each app (row)
+    of the allocation."""
+    # The vector of performances of each app is the same for every timeslot
+    return tuple(
+        tuple(performances[iclass, app] for iclass in alloc.instance_classes)
+        for app in alloc.apps
+    )
+
+
+def _allocation_and_performances(
+    alloc: Union[AllocationInfo, SolutionI, SolutionII],
+    performances: Optional[PerformanceValues],
+) -> Tuple[AllocationInfo, PerformanceValues]:
+    """Returns the allocation to use, and the performances, taken from the
+    problem of the solution if they are not given.
+
+    Raises:
+        ValueError: if ``alloc`` is not a solution and no performances are given.
+    """
+    if isinstance(alloc, (SolutionI, SolutionII)):
+        if performances is None:
+            performances = alloc.problem.performances.values
+        alloc = alloc.allocation
+    elif performances is None:
+        raise ValueError(
+            "The performances are required when the allocation is not a "
+            "SolutionI or SolutionII"
+        )
+    return alloc, performances
+
+
+def compute_allocation_cost(
+    alloc: Union[AllocationInfo, SolutionI, SolutionII]
+) -> AllocationInfo:
     """Computes the cost of each element of the allocation.
 
     Args:
-        alloc: the allocation whose cost has to be computed
+        alloc: the allocation whose cost has to be computed, or a solution
+            (:class:`SolutionI` or :class:`SolutionII`), to use its allocation
 
     Returns:
         Another allocation in which the ``values`` field contains
         the cost of that element (it is the original ``values``
         multiplied by the cost of the corresponding instance class)
     """
-    costs = []
-    for row in alloc.values:
-        costs_row = []
-        for app_alloc in row:
-            costs_app = []
-            for i, _ in enumerate(app_alloc):
-                costs_app.append(app_alloc[i] * alloc.instance_classes[i].price)
-            costs_row.append(tuple(costs_app))
-        costs.append(tuple(costs_row))
-
-    return alloc._replace(values=tuple(costs), units="cost")
-
+    if isinstance(alloc, (SolutionI, SolutionII)):
+        alloc = alloc.allocation
 
-@compute_allocation_cost.register(SolutionI)
-@compute_allocation_cost.register(SolutionII)
-def _(solution: Union[SolutionI, SolutionII]) -> AllocationInfo:
-    return compute_allocation_cost(solution.allocation)
+    (costs,) = _multiply_allocation_values(alloc.values, _price_matrix(alloc))
+    return alloc._replace(values=costs, units="cost")
 
 
-@singledispatch
 def compute_allocation_performance(
-    alloc: AllocationInfo, performances: PerformanceValues
+    alloc: Union[AllocationInfo, SolutionI, SolutionII],
+    performances: Optional[PerformanceValues] = None,
 ) -> AllocationInfo:
     """Computes the performance of each element of the allocation.
 
     Args:
-        alloc: the allocation whose performance has to be computed
+        alloc: the allocation whose performance has to be computed, or a solution
+            (:class:`SolutionI` or :class:`SolutionII`), to use its allocation
         performances: the set of performances for each pair of instance class
-            and application
+            and application. It can be omitted when ``alloc`` is a solution,
+            to use the performances of its problem
 
     Returns:
         Another allocation in which the ``values`` field contains
         the performance of that element (it is the original ``values``
         multiplied by the performance of the corresponding instance class
         for the corresponding app)
+
+    Raises:
+        ValueError: if ``alloc`` is an :class:`AllocationInfo` and
+            ``performances`` is omitted.
     """
-    perfs = []
-    for row in alloc.values:
-        perfs_row = []
-        for j, app_alloc in enumerate(row):
-            app = alloc.apps[j]
-            perfs_app = []
-            for i, _ in enumerate(app_alloc):
-                iclass = alloc.instance_classes[i]
-                perfs_app.append(app_alloc[i] * performances[iclass, app])
-            perfs_row.append(tuple(perfs_app))
-        perfs.append(tuple(perfs_row))
-    return alloc._replace(values=tuple(perfs), units="rph")
-
-
-@compute_allocation_performance.register(SolutionI)
-@compute_allocation_performance.register(SolutionII)
-def __(
-    solution: Union[SolutionI, SolutionII]
-) -> AllocationInfo:  # pylint:disable=function-redefined
-    return compute_allocation_performance(
-        solution.allocation, solution.problem.performances.values
+    alloc, performances = _allocation_and_performances(alloc, performances)
+
+    (perfs,) = _multiply_allocation_values(
+        alloc.values, _performance_matrix(alloc, performances)
+    )
+    return alloc._replace(values=perfs, units="rph")
+
+
+def compute_allocation_cost_and_performance(
+    alloc: Union[AllocationInfo, SolutionI, SolutionII],
+    performances: Optional[PerformanceValues] = None,
+) -> Tuple[AllocationInfo, AllocationInfo]:
+    """Computes both the cost and the performance of each element of the
+    allocation, traversing it only once.
+
+    Args:
+        alloc: the allocation whose cost and performance have to be computed,
+            or a solution (:class:`SolutionI` or :class:`SolutionII`), to use
+            its allocation
+        performances: the set of performances for each pair of instance class
+            and application. It can be omitted when ``alloc`` is a solution,
+            to use the performances of its problem
+
+    Returns:
+        A tuple with the same allocations returned by
+        :func:`compute_allocation_cost` and
+        :func:`compute_allocation_performance`
+
+    Raises:
+        ValueError: if ``alloc`` is an :class:`AllocationInfo` and
+            ``performances`` is omitted.
+    """
+    alloc, performances = _allocation_and_performances(alloc, performances)
+
+    costs, perfs = _multiply_allocation_values(
+        alloc.values, _price_matrix(alloc), _performance_matrix(alloc, performances)
+    )
+    return (
+        alloc._replace(values=costs, units="cost"),
+        alloc._replace(values=perfs, units="rph"),
     )
 
 
@@ -341,4 +485,5 @@ __all__ = [
     "SolutionII",
     "compute_allocation_cost",
     "compute_allocation_performance",
+    "compute_allocation_cost_and_performance",
 ]
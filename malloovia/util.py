@@ -10,11 +10,21 @@ from typing import (
     List,
     Set,
     Iterable,
+    DefaultDict,
+    TextIO,
+    Optional,
 )
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+import copy
 import os.path
 import gzip
+import hashlib
+import io
+import pickle
 import re
+import urllib.error
 import urllib.request
 
 # To use ruamel.yaml instead of pyyaml:
@@ -54,12 +64,15 @@ MallooviaObjectModel = Union[
     SolutionII,
 ]
 
+_INVALID_ANCHOR_CHARS = re.compile("[^0-9a-zA-Z_]+")
+
+
 def _sanitize(_id: str) -> str:
     """Sanitizes a string to use it as part of a YAML anchor.
     It allows only for alphanumeric characters, and all the others
     are replaced by underscore."""
 
-    return re.sub("[^0-9a-zA-Z_]+", "_", _id)
+    return _INVALID_ANCHOR_CHARS.sub("_", _id)
 
 
 def _anchor_from_id(obj: MallooviaObjectModel) -> str:
@@ -75,14 +88,30 @@ def _anchor_from_id(obj: MallooviaObjectModel) -> str:
         A string to be used as anchor
     """
 
+    # Fast path, which avoids hashing the whole object again
+    cached = _ANCHORS_BY_ID.get(id(obj))
+    if cached is not None:
+        return cached[1]
+
     # Special handling of SolutionI and SolutionII objects
     # since these objects contain fields of type List, and
     # thus they are not hashable, as required by lru_cache
     if type(obj) in [SolutionI, SolutionII]:
-        return "{}_{}".format(_sanitize(obj.id), hex(id(obj)))
+        anchor = "{}_{}".format(_sanitize(obj.id), hex(id(obj)))
+    else:
+        # For any other case, delegate to the cached version, which gives
+        # the same anchor to equal objects
+        anchor = __anchor_from_id_cached(obj)
+    _ANCHORS_BY_ID[id(obj)] = (obj, anchor)
+    return anchor
+
+
+# Anchors already generated, by id() of the object. The object is stored too,
+# to keep it alive, so that its id() cannot be reused by a different object.
+# It is emptied when problems_to_yaml or write_solutions_to_yaml return, so
+# those objects are kept alive only during the conversion
+_ANCHORS_BY_ID: Dict[int, Tuple[Any, str]] = {}
 
-    # For any other case, delegate to the cached version
-    return __anchor_from_id_cached(obj)
 
 @lru_cache(maxsize=None)
 def __anchor_from_id_cached(obj: MallooviaObjectModel) -> str:
@@ -106,7 +135,15 @@ def read_problems_from_yaml(filename: str) -> Mapping[str, Problem]:
 
     Raises:
         ValueError if the file has not the expected extension.
+
+    If the environment variable ``MALLOOVIA_YAML_CACHE`` is ``1``, the result is
+    cached on disk, and reused while neither the file nor the external workloads
+    it references change (see :func:`clear_yaml_cache`).
     """
+    return _cached_read(_read_problems_from_yaml, filename)
+
+
+def _read_problems_from_yaml(filename: str) -> Mapping[str, Problem]:
     _open = _get_open_function_from_extension(filename)
 
     with _open(filename, mode="rt", encoding="utf8") as stream:
@@ -115,7 +152,7 @@ def read_problems_from_yaml(filename: str) -> Mapping[str, Problem]:
 
 
 def read_problems_from_github(
-    dataset: str, _id: str = None, base_url: str = None
+    dataset: str, _id: str = None, base_url: Optional[str] = None
 ) -> Union[Problem, Mapping[str, Problem]]:
     """Reads a problem or set of problems from a GitHub repository.
 
@@ -133,17 +170,12 @@ def read_problems_from_github(
         A dictionary whose keys are problem ids, and the values are
         :class:`Problem` objects, or a single :class:`Problem` if the
         id is passed as argument.
-    """
 
-    if base_url is None:
-        base_url = (
-            "https://raw.githubusercontent.com/asi-uniovi/malloovia"
-            "/units/tests/test_data/problems/"
-        )
+    If the environment variable ``MALLOOVIA_YAML_CACHE`` is ``1``, the downloaded
+    file is cached on disk, and it is downloaded again only if its ETag changes.
+    """
 
-    url = "{}/{}.yaml".format(base_url, dataset)
-    with urllib.request.urlopen(url) as stream:
-        data = yaml.safe_load(stream)
+    data = yaml.safe_load(_download(_github_url(dataset, base_url)))
 
     problems = problems_from_dict(data, dataset)
 
@@ -153,6 +185,43 @@ def read_problems_from_github(
     return problems[_id]
 
 
+def read_problems_from_github_many(
+    datasets: Iterable[str], base_url: Optional[str] = None, max_workers: int = 8
+) -> Mapping[str, Mapping[str, Problem]]:
+    """Reads several sets of problems from a GitHub repository, downloading
+    them concurrently.
+
+    Args:
+        datasets: the names of the yaml files which contain the sets of problems,
+            without extension.
+        base_url: the url to the folder where the files are stored, as in
+            :func:`read_problems_from_github`.
+        max_workers: the maximum number of concurrent downloads.
+
+    Returns:
+        A dictionary whose keys are the datasets, and the values are
+        dictionaries whose keys are problem ids, and the values are
+        :class:`Problem` objects.
+    """
+    urls = {dataset: _github_url(dataset, base_url) for dataset in datasets}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        contents = executor.map(_download, urls.values())
+        # Parsing is CPU bound, so it is done in this thread
+        return {
+            dataset: problems_from_dict(yaml.safe_load(content), dataset)
+            for dataset, content in zip(urls, contents)
+        }
+
+
+def _github_url(dataset: str, base_url: Optional[str] = None) -> str:
+    if base_url is None:
+        base_url = (
+            "https://raw.githubusercontent.com/asi-uniovi/malloovia"
+            "/units/tests/test_data/problems/"
+        )
+    return "{}/{}.yaml".format(base_url, dataset)
+
+
 def problems_from_dict(
     data: Mapping[str, Any], yaml_filename: str
 ) -> Mapping[str, Problem]:
@@ -191,13 +260,16 @@ def _problems_and_ids_from_dict(
     # Mapping to remember which dictionaries were already converted to objects
     # Keys are object ids of dictionaries, values are the corresponding malloovia objects
     ids_to_objects: Dict[int, Any] = {}
+    # Values already read from external csv files, by filename
+    csv_values: Dict[str, Tuple[float, ...]] = {}
 
     def create_if_neccesary(_class, _dict):
         """Auxiliary function to instantiate a new object from a dict only
         if the same dict was not already instantiated"""
         # If already created, return the stored object
-        if id(_dict) in ids_to_objects:
-            return ids_to_objects[id(_dict)]
+        existing = ids_to_objects.get(id(_dict))
+        if existing is not None:
+            return existing
 
         # If _dict is not a dict, it is an already created object, return it
         if not isinstance(_dict, dict):
@@ -232,9 +304,14 @@ def _problems_and_ids_from_dict(
         for w_data in _list:
             w_data["app"] = create_if_neccesary(App, w_data["app"])
             if w_data.get("filename"):
-                values = read_from_relative_csv(
-                    filename=w_data["filename"], relative_to=yaml_filename
-                )
+                # Workloads which share the same file share also its values
+                path = os.path.normpath(w_data["filename"])
+                values = csv_values.get(path)
+                if values is None:
+                    values = read_from_relative_csv(
+                        filename=w_data["filename"], relative_to=yaml_filename
+                    )
+                    csv_values[path] = values
             else:
                 values = tuple(w_data["values"])
             w_data.update(values=values)
@@ -245,27 +322,28 @@ def _problems_and_ids_from_dict(
         of performance dictionaries whose keys are instance_classes and apps"""
         # Check if this set of performances was already converted to
         # a Performances object, and reuse it
-        if id(_dict) in ids_to_objects:
-            return ids_to_objects[id(_dict)]
+        existing = ids_to_objects.get(id(_dict))
+        if existing is not None:
+            return existing
 
         # Else, create a dictionary suited for Performances constructor
         _list = _dict["values"]
-        perf_dict = {}
+        perf_dict: DefaultDict[InstanceClass, Dict[App, float]] = defaultdict(dict)
+        lookup = ids_to_objects.__getitem__
         for p_data in _list:
             # Get references to instance_class and app objects. Hence all
             # required instance types and apps were already created by now,
             # their ids should be present in ids_to_objects.
             # Otherwise it would be a internal error, and an exception
             # will be raised
-            ic_object = ids_to_objects[id(p_data["instance_class"])]
-            app_object = ids_to_objects[id(p_data["app"])]
+            ic_object = lookup(id(p_data["instance_class"]))
+            app_object = lookup(id(p_data["app"]))
             value = p_data["value"]
-            if ic_object not in perf_dict:
-                perf_dict[ic_object] = {}
             perf_dict[ic_object][app_object] = float(value)
         perf = PerformanceSet(
             id=_dict["id"],
-            values=PerformanceValues(perf_dict),
+            # A plain dict, so that missing values are not silently created
+            values=PerformanceValues(dict(perf_dict)),
             time_unit=_dict["time_unit"],
         )
         ids_to_objects[id(_dict)] = perf
@@ -282,12 +360,13 @@ def _problems_and_ids_from_dict(
         create_workloads(problem["workloads"])
 
     # Now traverse again to create the performances and problems
+    lookup = ids_to_objects.__getitem__
     for problem in data["Problems"]:
         performances = create_performances(problem["performances"])
         problem.update(
-            workloads=tuple(ids_to_objects[id(w)] for w in problem["workloads"]),
+            workloads=tuple([lookup(id(w)) for w in problem["workloads"]]),
             instance_classes=tuple(
-                ids_to_objects[id(i)] for i in problem["instance_classes"]
+                [lookup(id(i)) for i in problem["instance_classes"]]
             ),
             performances=performances,
         )
@@ -311,7 +390,15 @@ def read_solutions_from_yaml(
 
     Raises:
         ValueError if the file has not the expected extension.
+
+    The result can be cached on disk, as in :func:`read_problems_from_yaml`.
     """
+    return _cached_read(_read_solutions_from_yaml, filename)
+
+
+def _read_solutions_from_yaml(
+    filename: str
+) -> Mapping[str, Union[SolutionI, SolutionII]]:
     _open = _get_open_function_from_extension(filename)
 
     with _open(filename, mode="rt", encoding="utf8") as stream:
@@ -337,6 +424,9 @@ def solutions_from_dict(
     # Keys are object ids of dictionaries, values are the corresponding malloovia objects
     ids_to_objects: Dict[int, Any] = {}
 
+    # Distinct allocation tuples already read
+    interned: Dict[Any, Any] = {}
+
     def _is_phase_i_solution(solution_dict):
         """Receives a solution as a dict generated by yaml_load() and returns
         true if is a phase I solution and false otherwise"""
@@ -355,19 +445,22 @@ def solutions_from_dict(
         return SolutionII(**solution_dict)
 
     def _dict_list_to_id_list(dict_list):
-        id_list = []
-        for item in dict_list:
-            id_list.append(ids_to_objects[id(item)])
-        return id_list
+        lookup = ids_to_objects.__getitem__
+        return [lookup(id(item)) for item in dict_list]
 
     def _convert_allocation(solution_dict):
         alloc = solution_dict["allocation"]
         alloc["apps"] = tuple(_dict_list_to_id_list(alloc["apps"]))
         alloc["instance_classes"] = tuple(_dict_list_to_id_list(alloc["instance_classes"]))
-        alloc["values"] = alloc.pop("vms_number")
-        alloc["values"] = tuple(
-            tuple(tuple(vms) for vms in app) for app in alloc["values"]
-        )
+        # Equal rows are shared by all the timeslots and solutions, as in the
+        # allocations created by Phase II
+        values = []
+        for t_alloc in alloc.pop("vms_number"):
+            t_values = tuple(
+                interned.setdefault(row, row) for row in map(tuple, t_alloc)
+            )
+            values.append(interned.setdefault(t_values, t_values))
+        alloc["values"] = tuple(values)
         if "units" not in alloc:
             alloc["units"] = "vms"
         if "workload_tuples" not in alloc:
@@ -408,10 +501,9 @@ def solutions_from_dict(
     def _convert_malloovia_stats_phase_ii(solution_dict):
         solving_stats = solution_dict.get("solving_stats")
         if solving_stats:
-            result = []
-            for stats in solving_stats:
-                result.append(_convert_solving_stats(stats))
-            solution_dict["solving_stats"] = result
+            solution_dict["solving_stats"] = [
+                _convert_solving_stats(stats) for stats in solving_stats
+            ]
 
     def _convert_global_solving_stats(solution_dict):
         g_solving_stats = solution_dict.get("global_solving_stats")
@@ -478,6 +570,17 @@ def problems_to_yaml(
     objects) and yaml references to those anchors, so that when the yaml is parsed back to python,
     the resulting dict contains internal references (instead of copies) to other dicts.
     """
+    try:
+        return _problems_to_yaml(problems)
+    finally:
+        _ANCHORS_BY_ID.clear()
+
+
+def _problems_to_yaml(
+    problems: Mapping[str, Problem]
+) -> str:  # pylint: disable=too-many-locals
+    """Does the work of :func:`problems_to_yaml`, without releasing the anchors
+    generated, so that it can be used also when writing solutions."""
 
     def collect_instance_classes_and_limiting_sets(
         problem
@@ -510,7 +613,7 @@ def problems_to_yaml(
         Limiting_sets part"""
         lines = []
         lines.append("Limiting_sets:")
-        for l_s in sorted(limiting_sets):
+        for l_s in _sorted_by_id(limiting_sets):
             lines.append("  - &{}".format(_anchor_from_id(l_s)))
             lines.extend(_namedtuple_to_yaml(l_s, level=2))
         lines.append("")
@@ -521,11 +624,11 @@ def problems_to_yaml(
         Instance_classes part"""
         lines = []
         lines.append("Instance_classes:")
-        for i_c in sorted(instance_classes):
+        for i_c in _sorted_by_id(instance_classes):
             anchor = _anchor_from_id(i_c)
             aux = i_c._replace(
                 limiting_sets="[{}]".format(
-                    ", ".join("*{}".format(_anchor_from_id(ls)) for ls in i_c.limiting_sets)
+                    ", ".join(["*" + _anchor_from_id(ls) for ls in i_c.limiting_sets])
                 )
             )
             lines.append("  - &{}".format(anchor))
@@ -538,7 +641,7 @@ def problems_to_yaml(
         Apps part"""
         lines = []
         lines.append("Apps:")
-        for app in sorted(apps):
+        for app in _sorted_by_id(apps):
             lines.append("  - &{}".format(_anchor_from_id(app)))
             lines.extend(_namedtuple_to_yaml(app, level=2))
         lines.append("")
@@ -551,7 +654,7 @@ def problems_to_yaml(
         # It is necessary to remove "filename" if it is None, or "values" if not
         # But fields cannot be removed from namedtuples, so we convert it to dict
         lines.append("Workloads:")
-        for w_l in sorted(workloads):
+        for w_l in _sorted_by_id(workloads):
             anchor = _anchor_from_id(w_l)
             aux = w_l._asdict()
             if aux["filename"]:
@@ -574,10 +677,10 @@ def problems_to_yaml(
             anchor = _anchor_from_id(prob)
             aux = prob._replace(
                 instance_classes="[{}]".format(
-                    ", ".join("*{}".format(_anchor_from_id(ic)) for ic in prob.instance_classes)
+                    ", ".join(["*" + _anchor_from_id(ic) for ic in prob.instance_classes])
                 ),
                 workloads="[{}]".format(
-                    ", ".join("*{}".format(_anchor_from_id(wl)) for wl in prob.workloads)
+                    ", ".join(["*" + _anchor_from_id(wl) for wl in prob.workloads])
                 ),
                 performances="*{}".format(_anchor_from_id(prob.performances)),
             )
@@ -591,15 +694,19 @@ def problems_to_yaml(
         Performances part"""
         lines = []
         lines.append("Performances:")
-        for perfset in sorted(performances):
+        for perfset in _sorted_by_id(performances):
             lines.append("  - &{}".format(_anchor_from_id(perfset)))
             lines.append("    id: {}".format(perfset.id))
             lines.append("    time_unit: {}".format(perfset.time_unit))
             lines.append("    values:")
-            for iclass, app, perf in perfset.values:
-                lines.append("      - instance_class: *{}".format(_anchor_from_id(iclass)))
-                lines.append("        app: *{}".format(_anchor_from_id(app)))
-                lines.append("        value: {}".format(perf))
+            # The three lines of each value are emitted as a single string
+            value_lines = (
+                "      - instance_class: *{}\n        app: *{}\n        value: {}"
+            )
+            lines.extend(
+                value_lines.format(_anchor_from_id(iclass), _anchor_from_id(app), perf)
+                for iclass, app, perf in perfset.values
+            )
         return lines
 
     # "main" body of the function
@@ -639,6 +746,10 @@ def problems_to_yaml(
     return "\n".join(yam)
 
 
+# Whole lines (including the line break) which reference an external problems file
+_PROBLEMS_FROM_FILE = re.compile("^Problems_from_file.*\n?", re.MULTILINE)
+
+
 def preprocess_yaml(input_yaml_filename: str) -> str:
     """Reads a YAML file and "expands" the ``Problems_from_file`` section.
 
@@ -652,16 +763,18 @@ def preprocess_yaml(input_yaml_filename: str) -> str:
 
     _open = _get_open_function_from_extension(input_yaml_filename)
 
-    output = []
     with _open(input_yaml_filename, mode="rt", encoding="utf8") as istream:
-        for line in istream:
-            if line.startswith("Problems_from_file"):
-                filename = line.split(":")[1].strip()
-                line = read_file_relative_to(
-                    filename=filename, relative_to=input_yaml_filename
-                )
-            output.append(line)
-    return "".join(output)
+        content = istream.read()
+
+    # Most files have no such section, and a plain search is much faster
+    if "Problems_from_file" not in content:
+        return content
+
+    def expand(match):
+        filename = match.group().split(":")[1].strip()
+        return read_file_relative_to(filename=filename, relative_to=input_yaml_filename)
+
+    return _PROBLEMS_FROM_FILE.sub(expand, content)
 
 
 def read_file_relative_to(filename: str, relative_to: str, kind: str = "yaml") -> str:
@@ -687,7 +800,8 @@ def read_file_relative_to(filename: str, relative_to: str, kind: str = "yaml") -
     path_to_input = os.path.abspath(relative_to)
     path_to_filename = os.path.join(os.path.dirname(path_to_input), filename)
     _open = _get_open_function_from_extension(filename, kind=kind)
-    return _open(path_to_filename, mode="rt", encoding="utf8").read()
+    with _open(path_to_filename, mode="rt", encoding="utf8") as stream:
+        return stream.read()
 
 
 def read_from_relative_csv(filename: str, relative_to: str) -> Tuple[float, ...]:
@@ -708,7 +822,7 @@ def read_from_relative_csv(filename: str, relative_to: str) -> Tuple[float, ...]
         FileNotFoundError: If the file is not found.
     """
     content = read_file_relative_to(filename, relative_to, kind="csv")
-    return tuple(float(line) for line in content.split("\n") if line)
+    return tuple(map(float, filter(None, content.split("\n"))))
 
 
 def solutions_to_yaml(solutions: Sequence[Union[SolutionI, SolutionII]]) -> str:
@@ -722,6 +836,35 @@ def solutions_to_yaml(solutions: Sequence[Union[SolutionI, SolutionII]]) -> str:
         associated problem. The YAML uses anchors and references
         to tie up the different parts.
     """
+    output = io.StringIO()
+    write_solutions_to_yaml(solutions, output)
+    return output.getvalue()
+
+
+def write_solutions_to_yaml(
+    solutions: Sequence[Union[SolutionI, SolutionII]], stream: TextIO
+) -> None:
+    """Writes a list of solutions as YAML to a text stream, such as an open file.
+
+    The YAML is the same returned by :func:`solutions_to_yaml`, but each solution
+    is written as soon as it is converted, so the whole YAML is never stored in
+    memory.
+
+    Args:
+        solutions: list of solutions to convert, each one can be a
+            :class:`SolutionI` or a :class:`SolutionII`.
+        stream: text stream in which the YAML is written.
+    """
+    try:
+        _write_solutions_to_yaml(solutions, stream)
+    finally:
+        _ANCHORS_BY_ID.clear()
+
+
+def _write_solutions_to_yaml(
+    solutions: Sequence[Union[SolutionI, SolutionII]], stream: TextIO
+) -> None:
+    """Does the work of :func:`write_solutions_to_yaml`"""
 
     def solution_i_to_yaml(sol: SolutionI) -> List[str]:
         """Converts a SolutionI to a yaml string"""
@@ -760,11 +903,17 @@ def solutions_to_yaml(solutions: Sequence[Union[SolutionI, SolutionII]]) -> str:
         lines.extend(global_solving_stats_to_yaml(sol.global_solving_stats, level=2))
 
         lines.append("  solving_stats:")
+        # Phase II reuses the same stats for the timeslots with the same
+        # workload, so the lines of each one are generated only once
+        stats_lines: Dict[int, List[str]] = {}
         for i, stats in enumerate(sol.solving_stats):
             lines.append(
                 "    - # {} -> {}".format(i, sol.allocation.workload_tuples[i])
             )
-            lines.extend(solving_stats_to_yaml(stats, level=3))
+            t_lines = stats_lines.get(id(stats))
+            if t_lines is None:
+                t_lines = stats_lines[id(stats)] = solving_stats_to_yaml(stats, level=3)
+            lines.extend(t_lines)
 
         lines.append("  allocation:")
         lines.extend(allocation_to_yaml(sol.allocation, level=2))
@@ -790,21 +939,16 @@ def solutions_to_yaml(solutions: Sequence[Union[SolutionI, SolutionII]]) -> str:
         stats: GlobalSolvingStats, level: int
     ) -> List[str]:
         """Converts a GlobalSolvingStats to a yaml string"""
-        lines: List[str] = []
         tab = "  " * level
-        lines.extend(
-            (
-                "{}creation_time: {}".format(tab, stats.creation_time),
-                "{}solving_time: {}".format(tab, stats.solving_time),
-                "{}optimal_cost: {}".format(tab, stats.optimal_cost),
-                "{}status: {}".format(tab, stats.status.name),
-            )
-        )
-        return lines
+        return [
+            "{}creation_time: {}".format(tab, stats.creation_time),
+            "{}solving_time: {}".format(tab, stats.solving_time),
+            "{}optimal_cost: {}".format(tab, stats.optimal_cost),
+            "{}status: {}".format(tab, stats.status.name),
+        ]
 
     def reserved_allocation_to_yaml(rsv: ReservedAllocation, level: int) -> List[str]:
         """Converts a ReservedAllocation to a yaml string"""
-        lines: List[str] = []
         tab = "  " * level
         if rsv is None:
             instance_classes: List[InstanceClass] = []
@@ -812,23 +956,20 @@ def solutions_to_yaml(solutions: Sequence[Union[SolutionI, SolutionII]]) -> str:
         else:
             instance_classes = list(rsv.instance_classes)
             vms_number = list(rsv.vms_number)
-        lines.extend(
-            (
-                "{}instance_classes: [{}]".format(
-                    tab, list_of_references_to_yaml(instance_classes)
-                ),
-                "{}vms_number: [{}]".format(tab, ", ".join(str(v) for v in vms_number)),
-            )
-        )
-        return lines
+        return [
+            "{}instance_classes: [{}]".format(
+                tab, list_of_references_to_yaml(instance_classes)
+            ),
+            "{}vms_number: [{}]".format(tab, ", ".join(map(str, vms_number))),
+        ]
 
     def list_of_references_to_yaml(lst: Sequence[Any]) -> str:
         """Generates a comma separated list of yaml references using the id"""
-        return ", ".join("*{}".format(_anchor_from_id(element)) for element in lst)
+        return ", ".join(["*" + _anchor_from_id(element) for element in lst])
 
     def list_to_yaml(lst: Iterable[Any]) -> str:
         """Generates a comma separated list of python objects"""
-        return ", ".join(str(element) for element in lst)
+        return ", ".join(map(str, lst))
 
     def allocation_to_yaml(alloc: AllocationInfo, level: int) -> List[str]:
         """Converts an AllocationInfo to a yaml string"""
@@ -860,34 +1001,55 @@ def solutions_to_yaml(solutions: Sequence[Union[SolutionI, SolutionII]]) -> str:
         )
         if values:
             lines.append("{}vms_number:".format(tab))
+            timeslot_prefix = "  {}- # ".format(tab)
+            app_prefix = "    {}- ".format(tab)
+            # The timeslots which share the same allocation (as in Phase II)
+            # share also its block of lines, which is generated only once
+            t_alloc_blocks: Dict[int, str] = {}
+            # The same happens with the workload tuples in the comments
+            wl_strs: Dict[int, str] = {}
             for i, t_alloc in enumerate(values):
-                lines.append("  {}- # {} -> {}".format(tab, i, workload_tuples[i]))
-                for app_alloc in t_alloc:
-                    lines.append("    {}- {}".format(tab, list(app_alloc)))
+                wl_str = wl_strs.get(id(workload_tuples[i]))
+                if wl_str is None:
+                    wl_str = wl_strs[id(workload_tuples[i])] = str(workload_tuples[i])
+                lines.append("{}{} -> {}".format(timeslot_prefix, i, wl_str))
+                t_block = t_alloc_blocks.get(id(t_alloc))
+                if t_block is None:
+                    t_block = "\n".join(
+                        [app_prefix + str(list(a_alloc)) for a_alloc in t_alloc]
+                    )
+                    t_alloc_blocks[id(t_alloc)] = t_block
+                lines.append(t_block)
         else:
             lines.append("{}vms_number: []".format(tab))
         return lines
 
-    # First collect all problems referenced in the solutions
-    problems = set()
-    for solution in solutions:
-        problems.add(solution.problem)
+    # First collect all problems referenced in the solutions, by id, to avoid
+    # hashing the whole problems (including the workload values)
+    problems = {solution.problem.id: solution.problem for solution in solutions}
     # Convert those problems to yaml
-    lines = []
-    lines.append(problems_to_yaml({p.id: p for p in problems}))
+    stream.write(_problems_to_yaml(problems))
 
-    # Now convert each solution
-    lines.append("Solutions:")
+    # Now convert and write each solution
+    stream.write("\nSolutions:")
     for solution in solutions:
         if isinstance(solution, SolutionI):
-            lines.extend(solution_i_to_yaml(solution))
+            lines = solution_i_to_yaml(solution)
         elif isinstance(solution, SolutionII):
-            lines.extend(solution_ii_to_yaml(solution))
+            lines = solution_ii_to_yaml(solution)
         else:
             raise ValueError(
                 "Solution({}) is of unknown type {}".format(solution.id, type(solution))
             )
-    return "\n".join(lines)
+        stream.write("\n")
+        stream.write("\n".join(lines))
+
+
+def _sorted_by_id(objects):
+    """Sorts malloovia objects in the same order than ``sorted()``, but comparing
+    only their ids (the first field), unless two of them have the same id. This
+    avoids comparing all the fields of the objects, including nested ones."""
+    return sorted(objects, key=lambda obj: (obj.id, obj))
 
 
 def _namedtuple_to_yaml(data, level=2):
@@ -913,11 +1075,10 @@ def _dict_to_yaml(data, level):
     Returns:
         array of lines to add to yaml array
     """
-    lines = []
-    for key, value in data.items():
-        value = _yamlize(value)
-        lines.append("{}{}: {}".format("  " * level, key, value))
-    return lines
+    tab = "  " * level
+    return [
+        "{}{}: {}".format(tab, key, _yamlize(value)) for key, value in data.items()
+    ]
 
 
 def _yamlize(value: Any) -> Any:
@@ -941,16 +1102,21 @@ def _yamlize(value: Any) -> Any:
     if value is False:
         return "false"
 
-    if hasattr(value, "name"):  # For Enums
-        return value.name  # pylint:disable=no-member
-
-    return value
+    # For Enums, with a single attribute lookup
+    return getattr(value, "name", value)
 
 
 def get_schema() -> Dict[str, Any]:
     """Returns Malloovia's json schema which can be used to validate the
     problem and solution files"""
 
+    # The schema is parsed only once, but each caller gets its own copy
+    # because it is usually modified for partial validations
+    return copy.deepcopy(_load_schema())
+
+
+@lru_cache(maxsize=1)
+def _load_schema() -> Dict[str, Any]:
     path_to_schema = os.path.join(os.path.dirname(__file__), "malloovia.schema.yaml")
     with open(path_to_schema) as schema_file:
         schema = yaml.safe_load(schema_file)
@@ -1066,12 +1232,250 @@ def allocation_info_as_dicts(
                 yield result
 
 
+def allocation_info_as_columns(
+    alloc: AllocationInfo,
+    use_ids=True,
+    include_timeslot=True,
+    include_workloads=True,
+    include_repeats=True,
+) -> Dict[str, List[Any]]:
+    """Converts the :class:`AllocationInfo` structure to a dictionary of columns,
+    with the same fields than :func:`allocation_info_as_dicts`. Each key is the
+    name of a field and its value is the list of the values of that field, in the
+    same order than the rows generated by :func:`allocation_info_as_dicts`.
+
+    This representation avoids the creation of a dictionary per row, so it is
+    much faster for big allocations, and it can be passed directly to pandas
+    DataFrame constructor.
+
+    Args:
+        alloc: The :class:`AllocationInfo` to convert
+        use_ids: True to use the ids of instance classes and apps, instead of the objects
+           which store those entities.
+        include_timeslot: False if you don't want the "timeslot" column
+        include_workloads: False if you don't want the "workload" column
+        include_repeats: False if you don't want the "repeats" column
+
+    Returns:
+        A dictionary whose keys are the names of the fields and whose values are
+        lists with the values of each field.
+
+    Example:
+
+        >>> import pandas as pd
+        >>> df = pd.DataFrame(
+                allocation_info_as_columns(
+                    alloc = phase_ii_solution.allocation,
+                    include_repeats=False))
+    """
+    # Either the ids or the objects, as they will appear in the columns
+    ic_labels: List[Any]
+    app_labels: List[Any]
+    if use_ids:
+        ic_labels = [ic.id for ic in alloc.instance_classes]
+        app_labels = [app.id for app in alloc.apps]
+    else:
+        ic_labels = list(alloc.instance_classes)
+        app_labels = list(alloc.apps)
+    n_slots = len(alloc.values)
+    n_ics = len(ic_labels)
+    cells_per_slot = len(app_labels) * n_ics
+
+    columns: Dict[str, List[Any]] = {}
+    columns["instance_class"] = ic_labels * (len(app_labels) * n_slots)
+    columns["app"] = [app for app in app_labels for _ in range(n_ics)] * n_slots
+    columns[alloc.units] = [
+        ic_alloc
+        for t_alloc in alloc.values
+        for a_alloc in t_alloc
+        for ic_alloc in a_alloc
+    ]
+    if include_workloads:
+        columns["workload"] = [
+            wl for wl in alloc.workload_tuples for _ in range(cells_per_slot)
+        ]
+    if include_timeslot:
+        columns["timeslot"] = [
+            slot for slot in range(n_slots) for _ in range(cells_per_slot)
+        ]
+    if include_repeats:
+        columns["repeats"] = [
+            repeats for repeats in alloc.repeats for _ in range(cells_per_slot)
+        ]
+    return columns
+
+
+def clear_yaml_cache() -> None:
+    """Removes all the problems and solutions cached by :func:`read_problems_from_yaml`
+    and ``read_solutions_from_yaml``, and the files downloaded by
+    :func:`read_problems_from_github`, when ``MALLOOVIA_YAML_CACHE`` is ``1``."""
+    cached_files = (
+        (_yaml_cache_dir(), (".pkl",)),
+        (_download_cache_dir(), (".yaml", ".etag")),
+    )
+    for folder, extensions in cached_files:
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            if name.endswith(extensions):
+                os.remove(os.path.join(folder, name))
+
+
+def _yaml_cache_dir() -> str:
+    """Returns the folder in which the parsed YAML files are cached"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "malloovia")
+
+
+def _download_cache_dir() -> str:
+    """Returns the folder in which the downloaded YAML files are cached"""
+    return os.path.join(_yaml_cache_dir(), "github")
+
+
+def _download(url: str) -> bytes:
+    """Returns the content of an url. If the cache is enabled through the
+    environment variable ``MALLOOVIA_YAML_CACHE``, the content is stored on disk
+    with its ETag, and it is only downloaded again if the ETag changes."""
+    if os.environ.get("MALLOOVIA_YAML_CACHE") != "1":
+        with urllib.request.urlopen(url) as response:
+            return response.read()
+
+    cache_file = os.path.join(
+        _download_cache_dir(), hashlib.sha256(url.encode()).hexdigest() + ".yaml"
+    )
+    etag_file = cache_file[: -len(".yaml")] + ".etag"
+    request = urllib.request.Request(url)
+    cached = None
+    try:
+        with open(etag_file) as stream:
+            etag = stream.read()
+        with open(cache_file, "rb") as stream:
+            cached = stream.read()
+        request.add_header("If-None-Match", etag)
+    except OSError:
+        pass
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            content = response.read()
+            etag = response.headers.get("ETag")
+    except urllib.error.HTTPError as error:
+        if error.code == 304 and cached is not None:
+            return cached
+        raise
+
+    if etag:
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, "wb") as stream:
+                stream.write(content)
+            with open(etag_file, "w") as stream:
+                stream.write(etag)
+        except OSError:
+            # The cache is only an optimization
+            pass
+    return content
+
+
+def _file_signature(filename: str) -> Tuple[str, int, int]:
+    """Returns the absolute path, modification time and size of a file"""
+    stat = os.stat(filename)
+    return (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+
+
+def _external_workload_files(filename: str, result: Mapping[str, Any]) -> List[str]:
+    """Returns the names of the csv files referenced by the workloads of the
+    problems (or the problems of the solutions) read from a YAML file"""
+    problems = {getattr(value, "problem", value) for value in result.values()}
+    yaml_dir = os.path.dirname(os.path.abspath(filename))
+    return sorted(
+        {
+            os.path.join(yaml_dir, wld.filename)
+            for problem in problems
+            for wld in problem.workloads
+            if wld.filename
+        }
+    )
+
+
+def _cached_read(read_function, filename: str):
+    """Returns ``read_function(filename)``, using the disk cache if it is enabled
+    through the environment variable ``MALLOOVIA_YAML_CACHE``.
+
+    Each cached result is stored with the signatures of the files it was read
+    from, and it is discarded if any of them does not match.
+    """
+    if os.environ.get("MALLOOVIA_YAML_CACHE") != "1":
+        return read_function(filename)
+
+    try:
+        key = repr((read_function.__name__, _file_signature(filename)))
+    except OSError:
+        # Let read_function report the error
+        return read_function(filename)
+    cache_file = os.path.join(
+        _yaml_cache_dir(), hashlib.blake2b(key.encode()).hexdigest() + ".pkl"
+    )
+
+    try:
+        with open(cache_file, "rb") as stream:
+            signatures, result = pickle.load(stream)
+        if all(_file_signature(sig[0]) == sig for sig in signatures):
+            return result
+    except Exception:  # pylint: disable=broad-except
+        # Missing, stale or corrupt cache file
+        pass
+
+    result = read_function(filename)
+    try:
+        signatures = [
+            _file_signature(name)
+            for name in [filename] + _external_workload_files(filename, result)
+        ]
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # Write to a temporary file first, to never leave a partial cache file
+        tmp_file = "{}.{}.tmp".format(cache_file, os.getpid())
+        with open(tmp_file, "wb") as stream:
+            pickle.dump((signatures, result), stream, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # The cache is only an optimization
+        pass
+    return result
+
+
+# Size of the read buffer for compressed files. Older Pythons decompress
+# in 8 KiB chunks, which is slow for large problems and solutions
+_GZIP_BUFFER_SIZE = 128 * 1024
+
+# Level 1 is much faster than the default 9, and YAML compresses well anyway
+_GZIP_COMPRESS_LEVEL = 1
+
+
+def _gzip_open(filename, mode="rb", encoding=None):
+    """Like ``gzip.open``, but reads in text mode through a larger buffer, and
+    writes in text mode with a fast compression level and a zero timestamp, so
+    that the same content always produces the same file."""
+    if mode == "rt":
+        gzip_file = gzip.GzipFile(filename, mode="rb")
+        return io.TextIOWrapper(
+            io.BufferedReader(gzip_file, buffer_size=_GZIP_BUFFER_SIZE),  # type: ignore
+            encoding=encoding,
+        )
+    if mode == "wt":
+        gzip_file = gzip.GzipFile(
+            filename, mode="wb", compresslevel=_GZIP_COMPRESS_LEVEL, mtime=0
+        )
+        return io.TextIOWrapper(gzip_file, encoding=encoding)  # type: ignore
+    return gzip.open(filename, mode=mode, encoding=encoding)
+
+
 def _get_open_function_from_extension(filename, kind="yaml"):
     """Returns the function open is the extension is ``kind`` or
-    'gzip.open' if it is ``kind``.gz'; otherwise, raises ValueError
+    a buffered 'gzip.open' if it is ``kind``.gz'; otherwise, raises ValueError
     """
     if filename.endswith(".{}.gz".format(kind)):
-        return gzip.open
+        return _gzip_open
     elif filename.endswith(".{}".format(kind)):
         return open
     else:
@@ -1081,8 +1485,12 @@ def _get_open_function_from_extension(filename, kind="yaml"):
 __all__ = [
     "read_problems_from_yaml",
     "read_problems_from_github",
+    "read_problems_from_github_many",
     "problems_to_yaml",
     "solutions_to_yaml",
+    "write_solutions_to_yaml",
     "get_schema",
     "allocation_info_as_dicts",
+    "allocation_info_as_columns",
+    "clear_yaml_cache",
 ]
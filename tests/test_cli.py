@@ -1,4 +1,5 @@
 "Test the command line interface"
+import gzip
 import os
 
 from click.testing import CliRunner
@@ -64,3 +65,18 @@ class TestCliModule(PresetDataPaths):
 
         # The command saves the solution in problem1-sol.yaml by default
         os.remove("{}-sol.yaml".format(filename[:-5]))
+
+    def test_solve_to_compressed_file(self, tmpdir):
+        """Test that the solutions are compressed if the output file ends in .gz"""
+
+        filename = self.get_problem("problem1.yaml")
+        output_file = str(tmpdir.join("problem1-sol.yaml.gz"))
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cli.cli, ["solve", filename, "--phase-i-id", "example", "-o", output_file]
+        )
+
+        assert result.exit_code == 0
+        with gzip.open(output_file, "rt") as solutions_file:
+            assert "Solutions:" in solutions_file.read()
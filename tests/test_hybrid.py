@@ -2,7 +2,7 @@
 from typing import Tuple
 import pytest  # type: ignore
 import ruamel.yaml
-from jsonschema import validate
+from jsonschema.validators import validator_for  # type: ignore
 from pulp import COIN, PulpSolverError  # type: ignore
 
 yaml = ruamel.yaml.YAML(typ="safe")
@@ -148,9 +148,17 @@ class TestExampleProblem:
 
         assert all(n_cores <= max_cores for n_cores in used_cores)
 
+@pytest.fixture(scope="session")
+def malloovia_validator():
+    """Validator for malloovia schema, which is checked and built only once"""
+    schema = util.get_schema()
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
 class TestStorageYaml:
 
-    def test_problem_with_private_to_yaml(self):
+    def test_problem_with_private_to_yaml(self, malloovia_validator):
         """Creates a problem which uses private instances, converts it to YAML,
         checks that the resulting YAML is valid, and finally reads it back
         to Python and compares it with the initial problem"""
@@ -165,9 +173,8 @@ class TestStorageYaml:
 
         # Check that the generated problem is valid against the schema      
         problem_data = yaml.safe_load(yaml_str)
-        malloovia_schema = util.get_schema()
         try:
-            validate(problem_data, malloovia_schema)
+            malloovia_validator.validate(problem_data)
         except Exception as e:
             pytest.fail("The generated yaml is not valid against the schema")
 
@@ -179,7 +186,7 @@ class TestStorageYaml:
         # original problem.
         assert problem == back_to_problems["example"]      
 
-    def test_solution_with_hybrid_to_yaml_back_and_forth(self):
+    def test_solution_with_hybrid_to_yaml_back_and_forth(self, malloovia_validator):
         """Creates and solves a problem which uses private instances, 
         converts the solution to YAML, checks that the resulting YAML
         is valid, and finally reads it back to Python and compares it
@@ -195,9 +202,8 @@ class TestStorageYaml:
         
         # Check that the generated solution is valid against the schema      
         solution_data = yaml.safe_load(yaml_str)
-        malloovia_schema = util.get_schema()
         try:
-            validate(solution_data, malloovia_schema)
+            malloovia_validator.validate(solution_data)
         except Exception as e:
             pytest.fail("The generated yaml is not valid against the schema")
 
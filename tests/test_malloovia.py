@@ -26,6 +26,7 @@ from malloovia.solution_model import (
     MallooviaHistogram,
     compute_allocation_cost,
     compute_allocation_performance,
+    compute_allocation_cost_and_performance,
 )
 from malloovia import lpsolver
 from .datapaths import PresetDataPaths
@@ -1133,6 +1134,48 @@ class TestMallooviaLpApi(PresetProblemPaths):
             wl_index = solution.allocation.workload_tuples.index((wl0, wl1))
             assert full.values[0] == solution.allocation.values[wl_index]
 
+    def test_emulate_phase_ii_updating_workloads(self):
+        """Solve phaseI, then emulate phase II reusing the same MallooviaLp
+        for all timeslots, only updating its workloads"""
+        problems = util.read_problems_from_yaml(self.problems["problem1"])
+        problem = problems["example"]
+        solution = phases.PhaseI(problem).solve()
+        system = system_from_problem(problem)
+
+        lp = None
+        predictor = phases.OmniscientSTWPredictor(problem.workloads)
+        for workloads in predictor:
+            if lp is None:
+                lp = lpsolver.MallooviaLp(
+                    system=system,
+                    workloads=workloads,
+                    preallocation=solution.reserved_allocation,
+                )
+                lp.create_problem()
+            else:
+                lp.update_workloads(workloads)
+            lp.solve()
+
+            # The allocation must match the phaseI solution for this workload tuple
+            full = lp.get_allocation()
+            wl_tuple = tuple(wl.values[0] for wl in workloads)
+            assert full.workload_tuples == [wl_tuple]
+            wl_index = solution.allocation.workload_tuples.index(wl_tuple)
+            assert full.values[0] == solution.allocation.values[wl_index]
+
+        # Problems for more than one timeslot cannot be updated
+        with pytest.raises(ValueError):
+            lp.update_workloads(problem.workloads)
+
+    def test_temporary_directory(self, monkeypatch):
+        """/dev/shm is used for the solver files only if enabled"""
+        monkeypatch.delenv("MALLOOVIA_SHM_TMPDIR", raising=False)
+        assert lpsolver._temporary_directory("/tmp") == "/tmp"
+        monkeypatch.setenv("MALLOOVIA_SHM_TMPDIR", "1")
+        assert lpsolver._temporary_directory("/other") == "/other"
+        if os.access(lpsolver._SHM_DIR, os.W_OK):
+            assert lpsolver._temporary_directory("/tmp") == lpsolver._SHM_DIR
+
 
 class TestPhaseII(PresetProblemPaths):
     def test_phase_ii_should_reject_infeasible_phase_i(self):
@@ -1167,6 +1210,8 @@ class TestPhaseII(PresetProblemPaths):
         assert rsv_instances == 6
 
         phase_ii = phases.PhaseII(problem=problem, phase_i_solution=solution_i)
+        # PuLP's default solver is used as is, without warm start
+        assert phase_ii.solver is None
         solution_ii = phase_ii.solve_period()
 
         timeslots = len(problem.workloads[0].values)
@@ -1175,6 +1220,10 @@ class TestPhaseII(PresetProblemPaths):
         # The first and last timeslot have exactly the same workload,
         # so they should have exactly the same solution
         assert solution_ii.allocation.values[0] is solution_ii.allocation.values[-1]
+        # and that shared allocation is multiplied only once
+        costs = compute_allocation_cost(solution_ii)
+        assert costs.values[0] is costs.values[-1]
+        assert costs.values[1] == compute_allocation_cost(solution_ii).values[1]
 
         # Since we used the same STWP than LTWP, each timeslot should
         # have the same allocation than in phaseI
@@ -1191,6 +1240,32 @@ class TestPhaseII(PresetProblemPaths):
             == solution_i.solving_stats.optimal_cost
         )
 
+    def test_phase_ii_in_processes(self):
+        """Solve phaseII in a pool of processes and compare with the sequential
+        solution"""
+        problems = util.read_problems_from_yaml(self.problems["problem1"])
+        problem = problems["example"]
+
+        solution_i = phases.PhaseI(problem).solve()
+        sequential = phases.PhaseII(
+            problem=problem, phase_i_solution=solution_i
+        ).solve_period()
+        parallel = phases.PhaseII(
+            problem=problem, phase_i_solution=solution_i
+        ).solve_period(max_workers=2)
+
+        assert parallel.allocation.values == sequential.allocation.values
+        assert parallel.allocation.values[0] is parallel.allocation.values[-1]
+        assert (
+            parallel.global_solving_stats.optimal_cost
+            == sequential.global_solving_stats.optimal_cost
+        )
+        # The allocation references the same apps than the problem
+        assert all(
+            app is wl.app
+            for app, wl in zip(parallel.allocation.apps, problem.workloads)
+        )
+
     def test_phase_ii_with_unfeasible_timeslots(self):
         """Solves phaseI and then uses for phase II a different STWP which causes
         unfeasible timeslots"""
@@ -1444,6 +1519,29 @@ class TestModelClasses(PresetProblemPaths):
         assert hist[(30, 30)] == 0
         assert str(hist) == "MallooviaHistogram with 3 values"
 
+        # Copies and arithmetic results are histograms which keep the apps
+        hist.apps = ("app0", "app1")
+        other = MallooviaHistogram({(10, 10): 1, (20, 20): 5})
+        other.apps = hist.apps
+        for result in (
+            hist.copy(),
+            hist + other,
+            hist - other,
+            hist | other,
+            hist & other,
+            +hist,
+            -hist,
+        ):
+            assert isinstance(result, MallooviaHistogram)
+            assert result.apps == hist.apps
+        assert hist.copy() == hist
+        assert hist + other == {(10, 10): 3, (10, 20): 1, (20, 20): 8}
+        # Non-positive counts are dropped, as in Counter
+        assert hist - other == {(10, 10): 1, (10, 20): 1}
+        other.apps = ("app1", "app0")
+        with pytest.raises(ValueError, match="different apps"):
+            hist + other
+
     def test_PerformanceValues(self):
         instances = [
             InstanceClass(
@@ -1518,6 +1616,10 @@ class TestModelClasses(PresetProblemPaths):
             ((30.0, 0.0), (1500.0, 0.0)),
         )
 
+        # The performances are required for an allocation
+        with pytest.raises(ValueError, match="performances are required"):
+            compute_allocation_performance(allocation)
+
         perfs = compute_allocation_performance(sol_i)
         assert perfs.units == "rph"
         assert perfs.values == (
@@ -1525,3 +1627,10 @@ class TestModelClasses(PresetProblemPaths):
             ((30.0, 10.0), (1500.0, 0.0)),
             ((30.0, 0.0), (1500.0, 0.0)),
         )
+
+        # Both can be computed at once
+        fused_costs, fused_perfs = compute_allocation_cost_and_performance(sol_i)
+        assert fused_costs == costs
+        assert fused_perfs == perfs
+        with pytest.raises(ValueError, match="performances are required"):
+            compute_allocation_cost_and_performance(allocation)
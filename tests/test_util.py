@@ -1,4 +1,10 @@
 "Tests for utility functions in malloovia"
+import gzip
+import http.server
+import io
+import os
+import threading
+import pytest
 import ruamel.yaml  # type: ignore
 from jsonschema import validate  # type: ignore
 
@@ -32,6 +38,42 @@ yaml.safe_load = yaml.load
 # pylint: disable=invalid-name
 
 
+@pytest.fixture
+def problems_server():
+    """Local HTTP server which serves the example problems, with ETag "v1",
+    in place of the GitHub repository. It yields its base url and the list
+    of the requests received, as pairs (path, If-None-Match header)"""
+    path_to_problems = os.path.join(os.path.dirname(__file__), "test_data", "problems")
+    requests = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            etag = self.headers.get("If-None-Match")
+            requests.append((self.path, etag))
+            if etag == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            with open(path_to_problems + self.path, "rb") as file:
+                content = file.read()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield "http://127.0.0.1:{}".format(server.server_port), requests
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
 class TestUtilModule(PresetDataPaths):
     """Test utility functions in malloovia"""
 
@@ -63,6 +105,8 @@ class TestUtilModule(PresetDataPaths):
         assert isinstance(prob["phaseI"].workloads[0].values, tuple)
         assert isinstance(prob["phaseI"].workloads[0].values[0], float)
         assert prob["phaseI"].workloads[0].values == prob["phaseI"].workloads[1].values
+        # The file is read only once
+        assert prob["phaseI"].workloads[0].values is prob["phaseI"].workloads[1].values
         assert prob["phaseI"].workloads[0].values == (
             20.0,
             12.0,
@@ -160,6 +204,12 @@ class TestUtilModule(PresetDataPaths):
         # It is necessary to dump both solutions, because phase ii contains
         # a reference to the solution of phase i
         sol_ii_yaml = util.solutions_to_yaml([sol_i, sol_ii])
+        # Which is the same YAML written to a stream
+        stream = io.StringIO()
+        util.write_solutions_to_yaml([sol_i, sol_ii], stream)
+        assert stream.getvalue() == sol_ii_yaml
+        # The anchors cache does not keep the solutions alive
+        assert not util._ANCHORS_BY_ID
         sol_ii_dict = yaml.safe_load(sol_ii_yaml)
         with open(self.get_schema("malloovia.schema.yaml")) as file:
             sol_schema = yaml.safe_load(file)
@@ -184,6 +234,36 @@ class TestUtilModule(PresetDataPaths):
         assert problem.workloads[0].values == (30, 32, 30, 30)
         assert problem.workloads[1].values == (1003, 1200, 1194, 1003)
 
+    def test_read_problems_from_github_cache(
+        self, tmpdir, monkeypatch, problems_server
+    ):
+        """Tests that downloaded problems are cached and revalidated by ETag"""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir))
+        monkeypatch.setenv("MALLOOVIA_YAML_CACHE", "1")
+        base_url, requests = problems_server
+        problems = util.read_problems_from_github("problem1", base_url=base_url)
+        cached = util.read_problems_from_github("problem1", base_url=base_url)
+
+        assert requests == [("/problem1.yaml", None), ("/problem1.yaml", '"v1"')]
+        assert cached == problems
+        assert problems["example"].workloads[0].values == (30, 32, 30, 30)
+
+    def test_read_problems_from_github_many(self, problems_server):
+        """Tests that several datasets can be downloaded at once"""
+        base_url, requests = problems_server
+        datasets = util.read_problems_from_github_many(
+            ["problem1", "problem2", "problem1"], base_url=base_url
+        )
+
+        assert sorted(path for path, _ in requests) == [
+            "/problem1.yaml",
+            "/problem2.yaml",
+        ]
+        assert list(datasets) == ["problem1", "problem2"]
+        assert datasets["problem1"] == util.read_problems_from_yaml(
+            self.get_problem("problem1.yaml")
+        )
+
     def test_read_solution_from_file(self):
         """Tests that YAML files with both solutions and problem definitions can be
         read"""
@@ -220,12 +300,73 @@ class TestUtilModule(PresetDataPaths):
         assert len(sol_phase_ii.allocation.values) == len(
             sol_phase_ii.problem.workloads[0].values
         )
+        # Timeslots with equal allocations share the same tuple
+        assert sol_phase_ii.allocation.values[0] is sol_phase_ii.allocation.values[1]
 
         # allocation.workload_tuples are read in phase I, but can be absent in Phase_II
         # In that case it is an empty list
         assert len(sol_phase_i.allocation.workload_tuples) > 0
         assert len(sol_phase_ii.allocation.workload_tuples) >= 0
 
+    def test_allocation_info_as_columns(self):
+        """Tests that the columns have the same contents than the dicts"""
+        filename = self.get_valid("problems_plus_solutions_with_allocation.yaml")
+        solutions = util.read_solutions_from_yaml(filename)
+        for solution in solutions.values():
+            for use_ids in (True, False):
+                rows = list(
+                    util.allocation_info_as_dicts(solution.allocation, use_ids=use_ids)
+                )
+                columns = util.allocation_info_as_columns(
+                    solution.allocation, use_ids=use_ids
+                )
+                assert columns == {key: [row[key] for row in rows] for key in rows[0]}
+
+    def test_get_schema_returns_a_copy(self):
+        """Tests that modifying the schema does not affect the next calls"""
+        schema = util.get_schema()
+        schema.pop("oneOf")
+        assert "oneOf" in util.get_schema()
+
+    def test_read_solution_from_compressed_file(self, tmpdir):
+        """Tests that gzipped YAML files are read as the uncompressed ones"""
+        filename = self.get_valid("problems_plus_solutions_with_allocation.yaml")
+        compressed = str(tmpdir.join("solutions.yaml.gz"))
+        with open(filename, "rb") as src, gzip.open(compressed, "wb") as dst:
+            dst.write(src.read())
+
+        assert util.read_solutions_from_yaml(
+            compressed
+        ) == util.read_solutions_from_yaml(filename)
+        assert util.preprocess_yaml(compressed) == util.preprocess_yaml(filename)
+
+    def test_yaml_cache(self, tmpdir, monkeypatch):
+        """Tests that parsed problems are cached on disk only when enabled, and
+        that the cache is invalidated when the external workloads change"""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir.join("cache")))
+        cache_dir = tmpdir.join("cache", "malloovia")
+        src = tmpdir.mkdir("src")
+        for name in ("problem_example_external_workload.yaml", "external_workload.csv"):
+            with open(self.get_valid(name)) as file:
+                src.join(name).write(file.read())
+        filename = str(src.join("problem_example_external_workload.yaml"))
+
+        problems = util.read_problems_from_yaml(filename)
+        assert not cache_dir.check()
+
+        monkeypatch.setenv("MALLOOVIA_YAML_CACHE", "1")
+        assert util.read_problems_from_yaml(filename) == problems
+        assert len(cache_dir.listdir()) == 1
+        assert util.read_problems_from_yaml(filename) == problems
+
+        src.join("external_workload.csv").write("1\n2\n", mode="a")
+        changed = util.read_problems_from_yaml(filename)
+        assert changed["phaseI"].workloads[0].values[-2:] == (1.0, 2.0)
+        assert len(cache_dir.listdir()) == 1
+
+        util.clear_yaml_cache()
+        assert cache_dir.listdir() == []
+
     def test_arbitrary_id_produce_valid_anchors(self):
         """Test the writer with a problem which contains in the 'id' some characters
         which are invalid for YAML anchors. The yaml writer should generate valid anchors,